@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
 import sys
+import time
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
@@ -17,8 +21,15 @@ ROOT_DIR = os.path.dirname(APP_DIR)
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
+from tonrag.aio import aclose_async_client  # noqa: E402
 from tonrag.rag import RAGPipeline  # noqa: E402
+from tonrag.registry import PipelineRegistry  # noqa: E402
+from tonrag.vectorstore import chroma_clients  # noqa: E402
 from tonrag.llm import CerebrasChat, GeminiChat  # noqa: E402
+from tonrag.config import settings  # noqa: E402
+from tonrag.metrics import REQUEST_SECONDS, collect_timings, render as render_metrics  # noqa: E402
+from tonrag.profiling import RequestProfiler  # noqa: E402
+from tonrag.warmup import make_warmer  # noqa: E402
 
 
 class ChatRequest(BaseModel):
@@ -28,6 +39,7 @@ class ChatRequest(BaseModel):
     gemini_api_key: Optional[str] = None
     cerebras_api_key: Optional[str] = None
     llm_api_key: Optional[str] = None
+    timings: Optional[bool] = False  # include per-stage timings (ms) in the response
 
 class DebugRetrieveRequest(BaseModel):
     query: str
@@ -38,8 +50,17 @@ class DebugAnswerRequest(BaseModel):
     top_k: Optional[int] = 3
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background; /health answers at once, /ready once warm
+    app.state.warmer.start()
+    yield
+    app.state.warmer.stop()
+    await aclose_async_client()
+
+
 def make_app() -> FastAPI:
-    app = FastAPI(title="RAG Chatbot", version="0.1.0")
+    app = FastAPI(title="RAG Chatbot", version="0.1.0", lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -54,6 +75,43 @@ def make_app() -> FastAPI:
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
     rag = RAGPipeline()
+    registry = PipelineRegistry(rag)
+    app.state.warmer = warmer = make_warmer(rag)
+
+    # Profiling middleware is only installed when enabled, so it costs nothing otherwise
+    profiler: Optional[RequestProfiler] = None
+    if settings.profile_every_n > 0 or settings.profile_header:
+        profiler = RequestProfiler(
+            every_n=settings.profile_every_n,
+            buffer_size=settings.profile_buffer_size,
+            interval=settings.profile_interval,
+        )
+
+        @app.middleware("http")
+        async def profile_requests(request: Request, call_next):
+            if not request.url.path.startswith("/api/chat"):
+                return await call_next(request)
+            forced = settings.profile_header and request.headers.get("x-debug-profile") == "1"
+            session = profiler.start(f"{request.method} {request.url.path}", forced=forced)
+            if session is None:
+                return await call_next(request)
+            try:
+                response = await call_next(request)
+            except Exception:
+                profiler.finish(session)
+                raise
+            body = response.body_iterator
+
+            async def profiled_body():
+                # Streamed answers are produced while the body is sent
+                try:
+                    async for chunk in body:
+                        yield chunk
+                finally:
+                    profiler.finish(session)
+
+            response.body_iterator = profiled_body()
+            return response
 
     @app.get("/")
     def index():
@@ -66,51 +124,129 @@ def make_app() -> FastAPI:
     def health():
         return {"status": "ok"}
 
+    @app.get("/ready")
+    def ready():
+        """200 once the collection, indexes and models are loaded (see WARMUP), else 503."""
+        report = warmer.report()
+        return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+    @app.get("/metrics")
+    def metrics():
+        """Prometheus metrics: per-stage latency histograms and answer/fallback counters."""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    def _timings_ms(timings: Dict[str, float], t0: float) -> Dict[str, float]:
+        out = {name: round(sec * 1000.0, 2) for name, sec in timings.items()}
+        out["total"] = round((time.perf_counter() - t0) * 1000.0, 2)
+        return out
+
+    def _select_pipeline(req: ChatRequest):
+        """Return (pipeline, backend name) for a chat request."""
+        if req.llm:
+            # Never mutate the shared instance; reuse a pooled pipeline per
+            # (backend, key, top_k) that shares its store and embeddings.
+            llm_choice = (req.llm or "").strip().lower()
+            if llm_choice not in ("ollama", "gemini", "cerebras"):
+                raise HTTPException(status_code=400, detail="Invalid 'llm' value; use 'ollama', 'gemini', or 'cerebras'")
+            key_override = (
+                req.llm_api_key
+                or (req.gemini_api_key if llm_choice == "gemini" else None)
+                or (req.cerebras_api_key if llm_choice == "cerebras" else None)
+            )
+            return registry.get(llm_choice, api_key=key_override, top_k=req.top_k), llm_choice
+        # Infer backend from shared pipeline
+        if isinstance(rag.chat, GeminiChat):
+            return rag, 'gemini'
+        if isinstance(rag.chat, CerebrasChat):
+            return rag, 'cerebras'
+        return rag, 'ollama'
+
+    def _trim_contexts(hits) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": c.get("id"),
+                "distance": c.get("distance"),
+                "document": (c.get("document") or "")[:2000],
+            }
+            for c in (hits or [])
+        ]
+
     @app.post("/api/chat")
-    def chat(req: ChatRequest):
+    async def chat(req: ChatRequest):
         q = (req.message or "").strip()
         if not q:
             raise HTTPException(status_code=400, detail="Missing 'message'")
         top_k = int(req.top_k or 5)
+        t0 = time.perf_counter()
         try:
-            # If llm override is provided, build a per-request pipeline to avoid
-            # mutating the shared instance (thread-safe for mixed backends).
-            used_llm = None
-            if req.llm:
-                llm_choice = (req.llm or "").strip().lower()
-                if llm_choice not in ("ollama", "gemini", "cerebras"):
-                    raise HTTPException(status_code=400, detail="Invalid 'llm' value; use 'ollama', 'gemini', or 'cerebras'")
-                key_override = (
-                    req.llm_api_key
-                    or (req.gemini_api_key if llm_choice == "gemini" else None)
-                    or (req.cerebras_api_key if llm_choice == "cerebras" else None)
-                )
-                local_rag = RAGPipeline(llm=llm_choice, api_key=key_override)
-                result = local_rag.answer(q, top_k=top_k)
-                used_llm = llm_choice
-            else:
-                result = rag.answer(q, top_k=top_k)
-                # Infer backend from shared pipeline
-                try:
-                    if isinstance(rag.chat, GeminiChat):
-                        used_llm = 'gemini'
-                    elif isinstance(rag.chat, CerebrasChat):
-                        used_llm = 'cerebras'
-                    else:
-                        used_llm = 'ollama'
-                except Exception:
-                    used_llm = 'ollama'
+            # A registry miss builds an SDK client; keep it off the event loop
+            pipeline, used_llm = await asyncio.to_thread(_select_pipeline, req)
+            with collect_timings() as timings:
+                result = await pipeline.aanswer(q, top_k=top_k)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"RAG error: {e}")
+        REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint="/api/chat", backend=used_llm)
+        contexts = _trim_contexts(result.get("contexts"))
+        out = {"answer": result.get("answer", ""), "contexts": contexts, "backend": used_llm}
+        if result.get("dropped"):
+            out["dropped"] = result["dropped"]
+        if req.timings:
+            out["timings"] = _timings_ms(timings, t0)
+        return out
+
+    @app.post("/api/chat/stream")
+    async def chat_stream(req: ChatRequest):
+        """Server-Sent Events variant of /api/chat.
+
+        Events: `contexts` (retrieved sources and backend), then `token`
+        pieces of the answer, then `done` with the full answer. Failures
+        are reported as an `error` event.
+        """
+        q = (req.message or "").strip()
+        if not q:
+            raise HTTPException(status_code=400, detail="Missing 'message'")
+        top_k = int(req.top_k or 5)
+        t0 = time.perf_counter()
+        try:
+            pipeline, used_llm = await asyncio.to_thread(_select_pipeline, req)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"RAG error: {e}")
-        contexts = [
-            {
-                "id": c.get("id"),
-                "distance": c.get("distance"),
-                "document": (c.get("document") or "")[:2000],
-            }
-            for c in (result.get("contexts") or [])
-        ]
-        return {"answer": result.get("answer", ""), "contexts": contexts, "backend": used_llm}
+
+        def sse(event: str, data: Dict[str, Any]) -> str:
+            return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        async def events():
+            with collect_timings() as timings:
+                try:
+                    async for ev in pipeline.aanswer_stream(q, top_k=top_k):
+                        kind = ev["type"]
+                        if kind == "contexts":
+                            data = {"contexts": _trim_contexts(ev["contexts"]), "backend": used_llm}
+                            if ev.get("dropped"):
+                                data["dropped"] = ev["dropped"]
+                            yield sse(kind, data)
+                        elif kind == "token":
+                            yield sse(kind, {"content": ev["content"]})
+                        elif kind == "error":
+                            yield sse(kind, {"detail": ev["error"]})
+                        else:
+                            done = {"answer": ev["answer"], "backend": used_llm}
+                            if req.timings:
+                                done["timings"] = _timings_ms(timings, t0)
+                            yield sse(kind, done)
+                except Exception as e:
+                    yield sse("error", {"detail": f"RAG error: {e}"})
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint="/api/chat/stream", backend=used_llm)
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     # Debug endpoints to bring dev checks into the app
     @app.get("/api/debug/config")
@@ -129,23 +265,52 @@ def make_app() -> FastAPI:
 
     @app.get("/api/debug/collections")
     def debug_collections():
-        import chromadb
-        from chromadb.errors import NotFoundError
-        from tonrag.config import settings as s
-        client = chromadb.PersistentClient(path=s.chroma_dir)
-        cols = []
-        for c in client.list_collections():
-            try:
-                count = client.get_collection(c.name).count()
-            except NotFoundError:
-                count = 0
-            cols.append({"name": c.name, "count": count})
-        return {"collections": cols}
+        return {"collections": chroma_clients.stats()}
+
+    @app.get("/api/debug/cache")
+    def debug_cache():
+        if rag.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **rag.cache.stats()}
+
+    @app.get("/api/debug/answer-cache")
+    def debug_answer_cache():
+        if rag.answer_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **rag.answer_cache.stats()}
+
+    @app.get("/api/debug/pipelines")
+    def debug_pipelines():
+        return registry.stats()
+
+    @app.get("/api/debug/profiles")
+    def debug_profiles():
+        if profiler is None:
+            return {"enabled": False, "profiles": []}
+        return {"enabled": True, "profiles": profiler.list()}
+
+    @app.get("/api/debug/profiles/{profile_id}")
+    def debug_profile(profile_id: int, format: str = "collapsed"):  # noqa: A002
+        """Download a profile as collapsed stacks (flamegraph.pl / speedscope), pstats, or a text table."""
+        prof = profiler.get(profile_id) if profiler is not None else None
+        if prof is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        if format == "collapsed":
+            return PlainTextResponse(prof.collapsed)
+        if format == "pstats":
+            return Response(
+                prof.pstats,
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": f'attachment; filename="profile-{prof.id}.pstats"'},
+            )
+        if format == "text":
+            return PlainTextResponse(prof.top())
+        raise HTTPException(status_code=400, detail="format must be 'collapsed', 'pstats' or 'text'")
 
     @app.post("/api/debug/retrieve")
-    def debug_retrieve(req: DebugRetrieveRequest):
+    async def debug_retrieve(req: DebugRetrieveRequest):
         try:
-            hits = rag.retrieve(req.query, top_k=int(req.top_k or 3))
+            hits = await rag.aretrieve(req.query, top_k=int(req.top_k or 3))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"retrieve failed: {e}")
         ctx = [
@@ -160,9 +325,9 @@ def make_app() -> FastAPI:
         return {"count": len(ctx), "contexts": ctx}
 
     @app.post("/api/debug/answer")
-    def debug_answer(req: DebugAnswerRequest):
+    async def debug_answer(req: DebugAnswerRequest):
         try:
-            res = rag.answer((req.question or "").strip(), top_k=int(req.top_k or 3))
+            res = await rag.aanswer((req.question or "").strip(), top_k=int(req.top_k or 3))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"answer failed: {e}")
         contexts = [
@@ -15,13 +15,24 @@ ROOT_DIR = os.path.dirname(APP_DIR)
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
-from tonrag.rag import RAGPipeline  # noqa: E402
-
 
 class RAGRequestHandler(SimpleHTTPRequestHandler):
     # Set static directory base
     static_dir = os.path.join(APP_DIR, "static")
-    rag = RAGPipeline()
+    # Built by setup_pipeline() when the server starts, not when this module is imported
+    rag = None
+    registry = None
+    warmer = None
+
+    @classmethod
+    def setup_pipeline(cls):
+        from tonrag.rag import RAGPipeline
+        from tonrag.registry import PipelineRegistry
+        from tonrag.warmup import make_warmer
+
+        cls.rag = RAGPipeline()
+        cls.registry = PipelineRegistry(cls.rag)
+        cls.warmer = make_warmer(cls.rag)
 
     def translate_path(self, path: str) -> str:
         # Serve files from static_dir
@@ -42,6 +53,12 @@ class RAGRequestHandler(SimpleHTTPRequestHandler):
         self.send_response(HTTPStatus.NO_CONTENT)
         self.end_headers()
 
+    def do_GET(self):  # noqa: N802
+        if urlparse(self.path).path == "/ready":
+            report = self.warmer.report()
+            return self._json(report, status=HTTPStatus.OK if report["ready"] else HTTPStatus.SERVICE_UNAVAILABLE)
+        super().do_GET()
+
     def do_POST(self):  # noqa: N802
         parsed = urlparse(self.path)
         if parsed.path == "/api/chat":
@@ -76,14 +93,12 @@ class RAGRequestHandler(SimpleHTTPRequestHandler):
                 return self._json({"error": "Missing 'message'"}, status=HTTPStatus.BAD_REQUEST)
 
             try:
-                # Instantiate per request if a different LLM is requested
+                # Reuse a pooled pipeline if a different LLM is requested
                 if llm is None:
                     rag = self.rag
                 else:
-                    if llm == 'gemini':
-                        rag = RAGPipeline(top_k=top_k, llm=llm, gemini_api_key=gemini_api_key)
-                    else:
-                        rag = RAGPipeline(top_k=top_k, llm=llm)
+                    api_key = gemini_api_key if llm == 'gemini' else None
+                    rag = self.registry.get(llm, api_key=api_key, top_k=top_k)
                 result = rag.answer(question, top_k=top_k)
             except Exception as e:
                 return self._json({"error": f"RAG error: {e}"}, status=HTTPStatus.INTERNAL_SERVER_ERROR)
@@ -112,13 +127,17 @@ def main():
     args = parser.parse_args()
 
     os.makedirs(os.path.join(APP_DIR, "static"), exist_ok=True)
+    RAGRequestHandler.setup_pipeline()
     server = ThreadingHTTPServer((args.host, args.port), RAGRequestHandler)
+    # Warm up in the background; GET /ready reports 200 once done
+    RAGRequestHandler.warmer.start()
     print(f"Serving on http://{args.host}:{args.port}")
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("Shutting down...")
     finally:
+        RAGRequestHandler.warmer.stop()
         server.server_close()
 
 
@@ -268,7 +268,7 @@ function addTyping() {
 
 function removeEl(el) { if (el && el.parentNode) el.parentNode.removeChild(el); }
 
-async function sendPrompt(q) {
+function buildPayload(q) {
   const llmChoice = llmEl ? (llmEl.value || '').toLowerCase() : undefined;
   const shouldIncludeKey = llmKeyRow && llmKeyRow.style.display !== 'none';
   const keyValue = shouldIncludeKey && llmKeyInput ? (llmKeyInput.value || '').trim() : '';
@@ -287,15 +287,113 @@ async function sendPrompt(q) {
       }
     }
   }
+  return payload;
+}
+
+async function sendPrompt(q) {
   const res = await fetch('/api/chat', {
     method: 'POST', headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(payload)
+    body: JSON.stringify(buildPayload(q))
   });
   const data = await res.json();
   if (!res.ok) throw new Error(data.detail || data.error || 'Request failed');
   return data;
 }
 
+// Stream /api/chat/stream (Server-Sent Events); calls onEvent(name, data) per event.
+// Throws an error with `fallback = true` when the server has no streaming endpoint.
+async function sendPromptStream(q, onEvent) {
+  const res = await fetch('/api/chat/stream', {
+    method: 'POST', headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+    body: JSON.stringify(buildPayload(q))
+  });
+  if (res.status === 404 || res.status === 405 || (res.ok && !res.body)) {
+    const err = new Error('Streaming unavailable');
+    err.fallback = true;
+    throw err;
+  }
+  if (!res.ok) {
+    let data = {};
+    try { data = await res.json(); } catch (e) {}
+    throw new Error(data.detail || data.error || 'Request failed');
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let idx;
+    while ((idx = buf.indexOf('\n\n')) >= 0) {
+      const raw = buf.slice(0, idx);
+      buf = buf.slice(idx + 2);
+      let event = 'message';
+      let data = '';
+      raw.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
+function showSources(contexts) {
+  renderSources(contexts || []);
+  if (sourcesPanelEl && sourcesToggleEl && sourcesToggleEl.checked) {
+    sourcesPanelEl.style.display = '';
+  }
+}
+
+async function answerBlocking(q, typingRow) {
+  const data = await sendPrompt(q);
+  removeEl(typingRow);
+  const answer = data.answer || '(no answer)';
+  const hasMd = /```|\*\*|\[[^\]]+\]\([^\)]+\)|^#|<\w+/.test(answer);
+  const contentEl = renderMessage({ role: 'assistant', content: hasMd ? answer : '', contexts: data.contexts || [] });
+  if (hasMd) {
+    contentEl.innerHTML = mdToHtml(answer);
+  } else {
+    await typewriter(contentEl, answer);
+  }
+  state.messages.push({ role: 'assistant', content: answer , contexts: data.contexts || []});
+  // Show latest sources in the sidebar
+  showSources(data.contexts);
+}
+
+async function answerStreaming(q, typingRow) {
+  let contentEl = null;
+  let answer = '';
+  let contexts = [];
+  let streamError = '';
+  await sendPromptStream(q, (event, data) => {
+    if (event === 'contexts') {
+      contexts = data.contexts || [];
+      showSources(contexts);
+    } else if (event === 'token') {
+      if (!contentEl) {
+        removeEl(typingRow);
+        contentEl = renderMessage({ role: 'assistant', content: '' });
+      }
+      answer += data.content || '';
+      contentEl.innerHTML = mdToHtml(answer);
+      messagesEl.scrollTop = messagesEl.scrollHeight;
+    } else if (event === 'done') {
+      answer = data.answer || answer;
+    } else if (event === 'error') {
+      streamError = data.detail || 'Request failed';
+    }
+  });
+  removeEl(typingRow);
+  if (!contentEl) {
+    if (streamError) throw new Error(streamError);
+    contentEl = renderMessage({ role: 'assistant', content: '' });
+  }
+  contentEl.innerHTML = mdToHtml(answer || '(no answer)');
+  state.messages.push({ role: 'assistant', content: answer, contexts });
+}
+
 async function handleSend(ev) {
   ev && ev.preventDefault();
   const q = (promptEl.value || '').trim();
@@ -311,21 +409,11 @@ async function handleSend(ev) {
   // Typing indicator
   const typingRow = addTyping();
   try {
-    const data = await sendPrompt(q);
-    removeEl(typingRow);
-    const answer = data.answer || '(no answer)';
-    const hasMd = /```|\*\*|\[[^\]]+\]\([^\)]+\)|^#|<\w+/.test(answer);
-    const contentEl = renderMessage({ role: 'assistant', content: hasMd ? answer : '', contexts: data.contexts || [] });
-    if (hasMd) {
-      contentEl.innerHTML = mdToHtml(answer);
-    } else {
-      await typewriter(contentEl, answer);
-    }
-    state.messages.push({ role: 'assistant', content: answer , contexts: data.contexts || []});
-    // Show latest sources in the sidebar
-    renderSources(data.contexts || []);
-    if (sourcesPanelEl && sourcesToggleEl && sourcesToggleEl.checked) {
-      sourcesPanelEl.style.display = '';
+    try {
+      await answerStreaming(q, typingRow);
+    } catch (err) {
+      if (!err.fallback) throw err;
+      await answerBlocking(q, typingRow);
     }
   } catch (err) {
     removeEl(typingRow);
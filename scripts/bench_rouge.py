@@ -0,0 +1,64 @@
+"""Compare the bit-parallel ROUGE-L against the reference DP on synthetic answers.
+
+    python scripts/bench_rouge.py --rows 300 --words 400 --workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import evaluation  # noqa: E402
+
+
+def make_corpus(rows: int, words: int, vocab: int, seed: int):
+    rng = random.Random(seed)
+    lexicon = [f"w{i}" for i in range(vocab)]
+    preds, refs = [], []
+    for _ in range(rows):
+        ref = [rng.choice(lexicon) for _ in range(rng.randint(words // 2, words))]
+        # Predictions share most of the reference, with edits, like real answers
+        pred = [t if rng.random() < 0.7 else rng.choice(lexicon) for t in ref]
+        pred += [rng.choice(lexicon) for _ in range(rng.randint(0, words // 4))]
+        preds.append(" ".join(pred))
+        refs.append(" ".join(ref))
+    return preds, refs
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--words", type=int, default=300)
+    ap.add_argument("--vocab", type=int, default=2000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    preds, refs = make_corpus(args.rows, args.words, args.vocab, args.seed)
+
+    fast = evaluation._lcs_len
+    evaluation._lcs_len = evaluation._lcs_len_dp
+    try:
+        ref_out, t_dp = timed(lambda: evaluation.rouge_l_corpus(preds, refs))
+    finally:
+        evaluation._lcs_len = fast
+    bit_out, t_bit = timed(lambda: evaluation.rouge_l_corpus(preds, refs))
+    pool_out, t_pool = timed(lambda: evaluation.rouge_l_corpus(preds, refs, workers=args.workers))
+
+    assert bit_out == ref_out and pool_out == ref_out, "results differ from the reference DP"
+    print(f"{args.rows} rows x ~{args.words} words")
+    print(f"  {'reference DP':<22}: {t_dp:8.3f}s")
+    print(f"  {'bit-parallel':<22}: {t_bit:8.3f}s  ({t_dp / t_bit:6.1f}x)")
+    print(f"  {f'bit-parallel x{args.workers} procs':<22}: {t_pool:8.3f}s  ({t_dp / t_pool:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,40 @@
 #!/usr/bin/env python3
+import argparse
 import csv
+import hashlib
+import json
 import os
+import time
+import sys
 from typing import List, Dict
 
 import chromadb
 from chromadb.utils import embedding_functions
 
+# Make the project root importable when run as `python scripts/build_vector_db.py`
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from tonrag.embeddings import Embeddings  # noqa: E402
+from tonrag.embedding_cache import CachedEmbeddings, get_default_embedding_cache  # noqa: E402
+
 
 CSV_PATH = os.path.join("data", "dmom_data.csv")
 DB_PATH = os.path.join("data", "chroma_dmom")
 COLLECTION_NAME = "dmom_qa"
+EF_MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+class ChromaEFEmbeddings(Embeddings):
+    """Adapt a Chroma embedding function to the tonrag Embeddings interface."""
+
+    def __init__(self, ef, model: str):
+        self.ef = ef
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[float(x) for x in vec] for vec in self.ef(texts)]
 
 
 def read_rows(csv_path: str) -> List[Dict[str, str]]:
@@ -32,7 +57,34 @@ def build_chunk(row: Dict[str, str]) -> str:
     return f"question: {q}\nanswer: {answer}\nreference: {ref}"
 
 
+def row_hash(chunk: str, meta: Dict[str, str]) -> str:
+    payload = chunk + "\n" + json.dumps(meta, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def stored_hashes(coll, page_size: int = 1000) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    offset = 0
+    while True:
+        res = coll.get(include=["metadatas"], limit=page_size, offset=offset)
+        ids = res.get("ids") or []
+        metas = res.get("metadatas") or []
+        for i, id_ in enumerate(ids):
+            out[id_] = ((metas[i] if i < len(metas) else None) or {}).get("row_hash", "")
+        if len(ids) < page_size:
+            return out
+        offset += page_size
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Build the dmom Chroma collection from data/dmom_data.csv")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep the collection; upsert changed rows and delete rows no longer in the CSV",
+    )
+    args = parser.parse_args()
+
     if not os.path.exists(CSV_PATH):
         raise SystemExit(f"CSV not found: {CSV_PATH}")
 
@@ -40,18 +92,28 @@ def main():
 
     # Embedding function (local, no API key required)
     ef = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="all-MiniLM-L6-v2"
+        model_name=EF_MODEL_NAME
     )
+    # Embed through the persistent cache so unchanged rows are not re-encoded
+    embedder: Embeddings = ChromaEFEmbeddings(ef, model=f"sentence-transformers/{EF_MODEL_NAME}")
+    cache = get_default_embedding_cache()
+    if cache is not None:
+        embedder = CachedEmbeddings(embedder, cache)
 
     client = chromadb.PersistentClient(path=DB_PATH)
 
-    # Re-create collection to ensure a clean ingest
-    try:
-        client.delete_collection(COLLECTION_NAME)
-    except Exception:
-        pass
+    if args.incremental:
+        coll = client.get_or_create_collection(name=COLLECTION_NAME, embedding_function=ef)
+        existing = stored_hashes(coll)
+    else:
+        # Re-create collection to ensure a clean ingest
+        try:
+            client.delete_collection(COLLECTION_NAME)
+        except Exception:
+            pass
 
-    coll = client.create_collection(name=COLLECTION_NAME, embedding_function=ef)
+        coll = client.create_collection(name=COLLECTION_NAME, embedding_function=ef)
+        existing = {}
 
     rows = read_rows(CSV_PATH)
     print(f"Loaded {len(rows)} rows from {CSV_PATH}")
@@ -79,31 +141,55 @@ def main():
             if not doc_id:
                 doc_id = str(idx)
 
+            meta = {
+                "no": doc_id,
+                "reference": (row.get("Reference") or "").strip(),
+                "source": "dmom_data.csv",
+                "has_manual_review": "true" if (row.get("Manually review") or "").strip() else "false",
+                "instruction": (row.get("instruction") or "").strip(),
+            }
+            meta["row_hash"] = row_hash(chunk, meta)
             documents.append(chunk)
-            metadatas.append(
-                {
-                    "no": doc_id,
-                    "reference": (row.get("Reference") or "").strip(),
-                    "source": "dmom_data.csv",
-                    "has_manual_review": "true" if (row.get("Manually review") or "").strip() else "false",
-                    "instruction": (row.get("instruction") or "").strip(),
-                }
-            )
+            metadatas.append(meta)
             ids.append(f"dmom-{doc_id}")
 
+    current = set(ids)
+    stale = [id_ for id_ in existing if id_ not in current]
+    if args.incremental:
+        keep = [i for i, id_ in enumerate(ids) if existing.get(id_) != metadatas[i]["row_hash"]]
+        print(f"{len(ids) - len(keep)} rows unchanged, {len(keep)} new or changed, {len(stale)} removed")
+        documents = [documents[i] for i in keep]
+        metadatas = [metadatas[i] for i in keep]
+        ids = [ids[i] for i in keep]
+
     print(f"Prepared {len(documents)} chunks for embedding")
 
     # Ingest in batches to manage memory/throughput
     batch_size = 256
     for start in range(0, len(documents), batch_size):
         end = start + batch_size
-        coll.add(
+        coll.upsert(
             documents=documents[start:end],
+            embeddings=embedder.embed_documents(documents[start:end]),
             metadatas=metadatas[start:end],
             ids=ids[start:end],
         )
         print(f"Ingested {min(end, len(documents))}/{len(documents)}")
 
+    if isinstance(embedder, CachedEmbeddings):
+        print(f"Embedding cache: {embedder.hits} reused, {embedder.misses} embedded ({embedder.cache.path})")
+        embedder.cache.close()
+
+    for start in range(0, len(stale), batch_size):
+        coll.delete(ids=stale[start:start + batch_size])
+    if stale:
+        print(f"Deleted {len(stale)} stale rows")
+    if args.incremental and (ids or stale):
+        # Let running servers notice same-size updates (see ChromaStore.mark_updated)
+        meta = {k: v for k, v in (coll.metadata or {}).items() if not k.startswith("hnsw:")}
+        meta["tonrag_updated_at"] = time.time()
+        coll.modify(metadata=meta)
+
     # Basic verification
     count = coll.count()
     print(f"Collection '{COLLECTION_NAME}' contains {count} documents")
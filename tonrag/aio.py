@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import asyncio
+import weakref
+from typing import TYPE_CHECKING
+
+from .config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+
+# One pooled client per event loop; httpx clients must not cross loops.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Shared keep-alive HTTP client for the running event loop.
+
+    All async Ollama/Gemini calls go through it, so concurrent requests
+    reuse one connection pool instead of opening sockets per call.
+    Timeouts are passed per request by the callers.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # Imported here so sync-only callers (CLI) never load httpx
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_connections,
+        )
+        client = httpx.AsyncClient(limits=limits, timeout=None)
+        _clients[loop] = client
+    return client
+
+
+async def aclose_async_client():
+    """Close the running loop's shared client (call on app shutdown)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+# Metric names end in a unit: `*_per_s` is a throughput (higher is better),
+# `*_ms` a latency and `*_count` a count of something unwanted (lower is better).
+Metrics = Dict[str, float]
+
+_WORDS = (
+    "mẹ bầu thai nhi sức khỏe dinh dưỡng khám thai tiêm phòng sắt canxi "
+    "axit folic siêu âm ốm nghén tăng cân huyết áp đường huyết sinh con "
+    "bác sĩ bệnh viện cô đỡ thôn bản chuyển dạ sau sinh cho con bú"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _timeit(fn: Callable[[], object], min_time: float) -> float:
+    """Seconds per call of `fn`, repeated until `min_time` has elapsed (best of 3 rounds)."""
+    best = float("inf")
+    for _ in range(3):
+        calls = 0
+        t0 = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - t0
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / calls)
+    return best
+
+
+def _percentiles(samples: List[float], prefix: str) -> Metrics:
+    xs = sorted(samples)
+
+    def pct(p: float) -> float:
+        return xs[min(len(xs) - 1, int(p * len(xs)))] * 1000.0
+
+    return {f"{prefix}_p50_ms": pct(0.50), f"{prefix}_p95_ms": pct(0.95), f"{prefix}_p99_ms": pct(0.99)}
+
+
+def bench_chunking(min_time: float = 0.5) -> Metrics:
+    from .chunking import chunk_text
+
+    text = _text(random.Random(0), 20000)
+    per_call = _timeit(lambda: chunk_text(text, chunk_size=800, chunk_overlap=120), min_time)
+    return {"chunking.chars_per_s": len(text) / per_call}
+
+
+def bench_embeddings(texts: int = 2000, dim: int = 64, latency: float = 0.002) -> Metrics:
+    """Throughput of OllamaEmbeddings against a local FakeOllama (no model, no network)."""
+    from .embeddings import OllamaEmbeddings
+    from .fake_ollama import FakeOllama
+
+    rng = random.Random(1)
+    docs = [_text(rng, 60) for _ in range(texts)]
+    with FakeOllama(dim=dim, embed_latency=latency) as server:
+        emb = OllamaEmbeddings(base_url=server.url, model="fake")
+        emb.embed_documents(docs[:8])  # open pooled connections
+        t0 = time.perf_counter()
+        emb.embed_documents(docs)
+        elapsed = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for q in docs[:100]:
+            emb.embed_query(q)
+        single = (time.perf_counter() - t0) / 100
+    return {"embed.texts_per_s": texts / elapsed, "embed.query_ms": single * 1000.0}
+
+
+def bench_chroma(sizes: List[int], dim: int = 64, queries: int = 200, top_k: int = 5) -> Metrics:
+    from .vectorstore import ChromaStore, chroma_clients
+
+    out: Metrics = {}
+    rng = random.Random(2)
+    tmp = tempfile.mkdtemp(prefix="tonrag-bench-")
+    try:
+        for n in sizes:
+            name = f"bench_{n}"
+            store = ChromaStore(collection_name=name, persist_dir=tmp, create_if_missing=True)
+            for start in range(0, n, 1000):
+                ids = [f"d{i}" for i in range(start, min(start + 1000, n))]
+                vecs = [[rng.uniform(-1.0, 1.0) for _ in range(dim)] for _ in ids]
+                store.add(ids=ids, documents=[f"doc {i}" for i in ids], embeddings=vecs)
+            qs = [[rng.uniform(-1.0, 1.0) for _ in range(dim)] for _ in range(queries)]
+            for q in qs[:10]:
+                store.query(q, top_k=top_k)
+            samples = []
+            for q in qs:
+                t0 = time.perf_counter()
+                store.query(q, top_k=top_k)
+                samples.append(time.perf_counter() - t0)
+            out.update(_percentiles(samples, f"chroma.query.{n}"))
+            chroma_clients.forget(name, tmp)
+    finally:
+        chroma_clients.drop_client(tmp)
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out
+
+
+def bench_prompt(min_time: float = 0.5) -> Metrics:
+    from .rag import build_prompt
+
+    rng = random.Random(3)
+    question = _text(rng, 15)
+    contexts = [_text(rng, 150) for _ in range(5)]
+    per_call = _timeit(lambda: build_prompt(question, contexts), min_time)
+    return {"prompt.builds_per_s": 1.0 / per_call}
+
+
+def bench_rouge(pairs: int = 200, words: int = 200) -> Metrics:
+    try:
+        from evaluation import rouge_l_corpus  # type: ignore
+    except Exception:
+        return {}
+    rng = random.Random(4)
+    refs = [_text(rng, words) for _ in range(pairs)]
+    preds = [" ".join(w if rng.random() < 0.7 else rng.choice(_WORDS) for w in r.split()) for r in refs]
+    t0 = time.perf_counter()
+    rouge_l_corpus(preds, refs)
+    return {"rouge.pairs_per_s": pairs / (time.perf_counter() - t0)}
+
+
+# Entry points whose cold import every CLI call or worker restart pays
+IMPORT_TARGETS = ("tonrag.cli", "tonrag.rag", "app.server", "app.main")
+# Dependencies that must only be loaded by the commands/backends using them
+HEAVY_MODULES = ("datasets", "pandas", "chromadb", "tqdm", "torch", "sentence_transformers", "cerebras", "google.genai")
+
+_IMPORT_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def bench_imports(modules=IMPORT_TARGETS, runs: int = 5) -> Metrics:
+    """Cold import time of each entry point in a fresh interpreter (best of `runs`).
+
+    Also counts the heavy dependencies that importing it drags in; modules
+    whose own dependencies are not installed here are skipped.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out: Metrics = {}
+    for module in modules:
+        code = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+        best, heavy = None, []
+        for _ in range(runs):
+            proc = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+            if proc.returncode != 0:
+                break
+            elapsed, heavy = json.loads(proc.stdout.strip().splitlines()[-1])
+            best = elapsed if best is None else min(best, elapsed)
+        if best is None:
+            continue
+        out[f"imports.{module}_ms"] = best * 1000.0
+        out[f"imports.{module}.heavy_count"] = float(len(heavy))
+    return out
+
+
+SUITES = ("chunking", "embed", "chroma", "prompt", "rouge", "imports")
+
+
+def run_suites(only: Optional[List[str]] = None, sizes: Optional[List[int]] = None) -> Metrics:
+    chosen = only or list(SUITES)
+    metrics: Metrics = {}
+    for suite in chosen:
+        if suite == "chunking":
+            metrics.update(bench_chunking())
+        elif suite == "embed":
+            metrics.update(bench_embeddings())
+        elif suite == "chroma":
+            metrics.update(bench_chroma(sizes or [1000, 10000]))
+        elif suite == "prompt":
+            metrics.update(bench_prompt())
+        elif suite == "rouge":
+            metrics.update(bench_rouge())
+        elif suite == "imports":
+            metrics.update(bench_imports())
+        else:
+            raise ValueError(f"Unknown benchmark suite '{suite}' (choose from {', '.join(SUITES)})")
+    return metrics
+
+
+def compare(metrics: Metrics, baseline: Metrics, tolerance: float) -> List[str]:
+    """Metrics that got worse than `baseline` by more than `tolerance` (a fraction)."""
+    regressions = []
+    for name, base in sorted(baseline.items()):
+        cur = metrics.get(name)
+        if cur is None:
+            continue
+        if not base:
+            # Relative change is undefined; any heavy import appearing is a regression
+            if name.endswith("_count") and cur > 0:
+                regressions.append(f"{name}: {cur:.4g} vs baseline 0")
+            continue
+        if name.endswith("_per_s"):
+            change = (base - cur) / base
+        else:
+            change = (cur - base) / base
+        if change > tolerance:
+            regressions.append(f"{name}: {cur:.4g} vs baseline {base:.4g} ({change:+.0%} worse)")
+    return regressions
+
+
+def load_metrics(path: str) -> Metrics:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("metrics", data)
+
+
+def save_metrics(path: str, metrics: Metrics):
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    data = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "metrics": metrics,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def summarize(metrics: Metrics) -> str:
+    width = max((len(k) for k in metrics), default=0)
+    return "\n".join(f"{k:<{width}}  {v:12.4g}" for k, v in sorted(metrics.items()))
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+_MISSING = object()
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form used as a cache key: NFC, lowercased, single spaces."""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.lower().split())
+
+
+def embedding_key(embedding: List[float]) -> str:
+    """Compact, hashable digest of an embedding vector (float32 bytes)."""
+    return hashlib.blake2b(array("f", embedding).tobytes(), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with an optional TTL and hit/miss counters."""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max(0, int(max_size))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            stored_at, value = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+class RetrievalCache:
+    """Two-level cache in front of retrieval.
+
+    - `embeddings`: normalized query -> query embedding (skips the Ollama call)
+    - `hits`: (embedding digest | normalized text, top_k) -> retrieved hits
+      (skips the vector search)
+
+    Both levels are dropped whenever the collection fingerprint passed to
+    `sync` changes, so re-ingesting never serves stale hits.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.embeddings = LRUCache(max_size=max_size, ttl=ttl)
+        self.hits = LRUCache(max_size=max_size, ttl=ttl)
+        self._fingerprint: Optional[Tuple] = None
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def sync(self, fingerprint: Optional[Tuple]):
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            if self._fingerprint is not None:
+                self.invalidations += 1
+            self._fingerprint = fingerprint
+        self.clear()
+
+    def clear(self):
+        self.embeddings.clear()
+        self.hits.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "embeddings": self.embeddings.stats(),
+            "hits": self.hits.stats(),
+            "invalidations": self.invalidations,
+        }
+
+
+def _unit(vec: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vec))
+    return [x / norm for x in vec] if norm else list(vec)
+
+
+class SemanticAnswerCache:
+    """Generated answers reused for paraphrased questions.
+
+    An entry stores (unit query embedding, retrieved ids, backend, answer).
+    A lookup hits when the same backend retrieved exactly the same ids and
+    the cosine similarity of the query embeddings is at least `threshold`;
+    requiring identical ids means the LLM would have seen the same context.
+    Entries are bucketed by (backend, ids) so only a handful of vectors are
+    compared per lookup. Capped at `max_entries` (LRU), expired after `ttl`
+    seconds, and dropped whenever the collection fingerprint changes.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = None, threshold: float = 0.95):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, Tuple[float, Tuple, List[float], str]]" = OrderedDict()
+        self._buckets: Dict[Tuple, List[int]] = {}
+        self._next = 0
+        self._fingerprint: Optional[Tuple] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _drop(self, entry_id: int):
+        _, bucket, _, _ = self._entries.pop(entry_id)
+        ids = self._buckets.get(bucket)
+        if ids is not None:
+            ids.remove(entry_id)
+            if not ids:
+                del self._buckets[bucket]
+
+    def get(self, embedding: List[float], ids: List[str], backend: str) -> Optional[str]:
+        bucket = (backend, tuple(ids))
+        q = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_sim = None, self.threshold
+            for entry_id in list(self._buckets.get(bucket, ())):
+                stored_at, _, vec, _ = self._entries[entry_id]
+                if self.ttl is not None and now - stored_at > self.ttl:
+                    self._drop(entry_id)
+                    continue
+                sim = sum(a * b for a, b in zip(q, vec))
+                if sim >= best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][3]
+
+    def put(self, embedding: List[float], ids: List[str], backend: str, answer: str):
+        if self.max_entries == 0 or not answer:
+            return
+        bucket = (backend, tuple(ids))
+        with self._lock:
+            entry_id = self._next
+            self._next += 1
+            self._entries[entry_id] = (time.monotonic(), bucket, _unit(embedding), answer)
+            self._buckets.setdefault(bucket, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def sync(self, fingerprint: Optional[Tuple]):
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            if self._fingerprint is not None:
+                self.invalidations += 1
+            self._fingerprint = fingerprint
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
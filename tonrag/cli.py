@@ -2,22 +2,19 @@ from __future__ import annotations
 
 import argparse
 import os
+import time
 from typing import List, Optional
-from tqdm import tqdm
 
 from .config import settings
-from .dataset import load_hf_dataset, load_csv_dataset, suggest_fields, get_fields
-from .embeddings import get_default_embeddings
-from .vectorstore import ChromaStore
-from .chunking import chunk_text
-from .rag import RAGPipeline
-try:
-    from evaluation import rouge_l_corpus  # type: ignore
-except Exception:
-    rouge_l_corpus = None  # type: ignore
+
+# Heavy dependencies (datasets, pandas, chromadb, tqdm, the RAG stack) are
+# imported inside the commands that use them, so `tonrag query` or
+# `tonrag --help` do not pay for loading all of them.
 
 
 def _load_any_dataset(args: argparse.Namespace):
+    from .dataset import load_csv_dataset, load_hf_dataset
+
     if getattr(args, "csv", None):
         return load_csv_dataset(args.csv)
     if getattr(args, "dataset", None):
@@ -26,6 +23,8 @@ def _load_any_dataset(args: argparse.Namespace):
 
 
 def cmd_inspect(args: argparse.Namespace):
+    from .dataset import suggest_fields
+
     ds = _load_any_dataset(args)
     cols = list(ds.features.keys())
     print(f"Dataset: {args.dataset} | split: {args.split}")
@@ -37,6 +36,14 @@ def cmd_inspect(args: argparse.Namespace):
 
 
 def cmd_ingest(args: argparse.Namespace):
+    from tqdm import tqdm
+
+    from .dataset import CSVDataset, get_fields
+    from .embedding_cache import CachedEmbeddings, get_default_embedding_cache
+    from .embeddings import get_default_embeddings
+    from .ingest import IncrementalDiff, iter_chunks, load_row_index, run_pipeline
+    from .vectorstore import ChromaStore
+
     ds = _load_any_dataset(args)
     try:
         text_field, id_field, _, _ = get_fields(
@@ -46,35 +53,169 @@ def cmd_ingest(args: argparse.Namespace):
         print(f"[ingest] {e}")
         print("Use 'python -m tonrag.cli inspect --dataset ... --split ...' to see columns.")
         return
+    # Only these columns are read (for CSVs, before any row is loaded)
+    ds = ds.select_columns(list(dict.fromkeys(c for c in (text_field, id_field) if c)))
 
     emb = get_default_embeddings()
+    cache = None if args.no_embedding_cache else get_default_embedding_cache(args.embedding_cache)
+    if cache is not None:
+        emb = CachedEmbeddings(emb, cache)
     store = ChromaStore(persist_dir=settings.chroma_dir, collection_name=settings.collection_name, create_if_missing=True)
 
-    ids: List[str] = []
-    docs: List[str] = []
-    metas: List[dict] = []
-
-    # chunk and prepare
-    for i in tqdm(range(len(ds)), desc="Chunking"):
-        row = ds[i]
-        base_id = str(row[id_field]) if id_field else str(i)
-        text = row[text_field]
-        chunks = chunk_text(text or "", chunk_size=args.chunk_size or settings.chunk_size, chunk_overlap=args.chunk_overlap or settings.chunk_overlap)
-        for j, ch in enumerate(chunks):
-            ids.append(f"{base_id}-{j}")
-            docs.append(ch)
-            metas.append({"row_id": base_id, "chunk": j})
-
-    # embed in batches to avoid large payloads
-    embeddings: List[List[float]] = []
-    batch_size = args.batch_size
-    for k in tqdm(range(0, len(docs), batch_size), desc="Embedding"):
-        batch = docs[k:k+batch_size]
-        embeddings.extend(emb.embed_documents(batch))
-
-    # add to chroma
-    store.add(ids=ids, documents=docs, embeddings=embeddings, metadatas=metas)
-    print(f"Ingested {len(docs)} chunks into collection '{settings.collection_name}'.")
+    chunk_size = args.chunk_size or settings.chunk_size
+    chunk_overlap = args.chunk_overlap or settings.chunk_overlap
+    # Iterate instead of indexing so a CSV streams row by row rather than
+    # being loaded into memory first
+    total = ds.row_count_hint() if isinstance(ds, CSVDataset) else len(ds)
+    rows = tqdm(ds, total=total, desc="Ingesting rows")
+
+    # rows -> chunks -> embedding batches -> Chroma write batches, streamed
+    if args.incremental:
+        diff = IncrementalDiff(load_row_index(store))
+        chunks = diff.chunks(rows, text_field, id_field, chunk_size, chunk_overlap)
+        written = run_pipeline(
+            chunks,
+            emb,
+            lambda ids, docs, vecs, metas: store.upsert(ids=ids, documents=docs, embeddings=vecs, metadatas=metas),
+            embed_batch_size=args.batch_size,
+            write_batch_size=args.write_batch_size,
+            queue_size=args.queue_size,
+        )
+        store.delete(diff.stale_ids)
+        if written or diff.stale_ids:
+            store.mark_updated()
+        print(
+            f"Incremental ingest into '{settings.collection_name}': {diff.changed_rows} rows changed "
+            f"({written} chunks upserted), {diff.unchanged_rows} unchanged, {diff.removed_rows} removed, "
+            f"{len(diff.stale_ids)} stale chunks deleted."
+        )
+    else:
+        chunks = iter_chunks(rows, text_field, id_field, chunk_size, chunk_overlap)
+        written = run_pipeline(
+            chunks,
+            emb,
+            lambda ids, docs, vecs, metas: store.add(ids=ids, documents=docs, embeddings=vecs, metadatas=metas),
+            embed_batch_size=args.batch_size,
+            write_batch_size=args.write_batch_size,
+            queue_size=args.queue_size,
+        )
+        print(f"Ingested {written} chunks into collection '{settings.collection_name}'.")
+    if isinstance(emb, CachedEmbeddings):
+        print(f"Embedding cache: {emb.hits} reused, {emb.misses} embedded ({emb.cache.path}).")
+        emb.cache.close()
+
+
+def cmd_embcache(args: argparse.Namespace):
+    from .embedding_cache import get_default_embedding_cache
+
+    cache = get_default_embedding_cache(args.path)
+    if cache is None:
+        print("[embcache] Embedding cache disabled (EMBEDDING_CACHE_PATH is empty).")
+        return
+    try:
+        if args.action == "prune":
+            if args.max_age_days is None and args.max_entries is None:
+                print("[embcache] Nothing to prune: pass --max-age-days and/or --max-entries.")
+            else:
+                removed = cache.prune(max_age_days=args.max_age_days, max_entries=args.max_entries, model=args.model)
+                print(f"Removed {removed} entries.")
+        print(cache.size())
+    finally:
+        cache.close()
+
+
+def cmd_snapshot(args: argparse.Namespace):
+    from .numpy_store import NumpyStore
+    from .vectorstore import ChromaStore
+
+    out = args.out or settings.numpy_snapshot_path
+    if not out:
+        print("[snapshot] Pass --out or set NUMPY_SNAPSHOT_PATH.")
+        return
+    source = ChromaStore(create_if_missing=False)
+    t0 = time.perf_counter()
+    store = NumpyStore(source)
+    store.save_snapshot(out, source.fingerprint()[:4])
+    print(f"Wrote {store.count()} vectors from '{source.name}' to {out} (+ .json) in {time.perf_counter() - t0:.2f}s.")
+
+
+def cmd_bench(args: argparse.Namespace):
+    from .bench import compare, load_metrics, run_suites, save_metrics, summarize
+
+    only = [s.strip() for s in args.only.split(",") if s.strip()] if args.only else None
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    metrics = run_suites(only=only, sizes=sizes)
+    print(summarize(metrics))
+    if args.out:
+        save_metrics(args.out, metrics)
+        print(f"Wrote {args.out}")
+    if args.update_baseline:
+        save_metrics(args.baseline, metrics)
+        print(f"Updated baseline {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"[bench] No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return
+    regressions = compare(metrics, load_metrics(args.baseline), args.tolerance)
+    if regressions:
+        print(f"[bench] {len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print("  " + line)
+        raise SystemExit(1)
+    print(f"[bench] No regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+
+def cmd_loadtest(args: argparse.Namespace):
+    import json
+
+    from .loadtest import run_load
+
+    questions = None
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    extra = {"top_k": args.top_k}
+    if args.llm:
+        extra["llm"] = args.llm
+    url = args.url.rstrip("/") + ("/api/chat/stream" if args.stream else "/api/chat")
+    mode = f"{args.rate}/s open loop" if args.rate else "closed loop"
+    print(f"[loadtest] {url}: {args.concurrency} workers, {mode}, {args.duration}s")
+    report = run_load(
+        url,
+        questions=questions,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        duration=args.duration,
+        max_requests=args.requests,
+        stream=args.stream,
+        extra=extra,
+        timeout=args.timeout,
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def cmd_fake_ollama(args: argparse.Namespace):
+    from .fake_ollama import FakeOllama
+
+    server = FakeOllama(
+        host=args.host,
+        port=args.port,
+        dim=args.dim,
+        embed_latency=args.embed_latency,
+        chat_latency=args.chat_latency,
+        tokens_per_s=args.tokens_per_s,
+        max_tokens=args.max_tokens,
+    )
+    print(f"Fake Ollama listening on {server.url} (set OLLAMA_BASE_URL to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 
 def _strip_markdown_html(s: str) -> str:
@@ -97,6 +238,8 @@ def _strip_markdown_html(s: str) -> str:
 
 
 def cmd_query(args: argparse.Namespace):
+    from .rag import RAGPipeline
+
     rag = RAGPipeline(top_k=args.top_k, llm=getattr(args, 'llm', None))
     res = rag.answer(args.question, top_k=args.top_k)
     ans = res["answer"]
@@ -109,46 +252,63 @@ def cmd_query(args: argparse.Namespace):
         print(hit["document"])
 
 
-def _normalize(s: str) -> str:
-    return (s or "").strip().lower()
+def cmd_eval(args: argparse.Namespace):
+    from tqdm import tqdm
 
+    from .dataset import get_fields
+    from .eval_runner import RateLimiter, ResultWriter, load_done, parse_rate_limits, run_eval, score_results
+    from .rag import RAGPipeline
+
+    try:
+        from evaluation import rouge_l_corpus  # type: ignore
+    except Exception:
+        rouge_l_corpus = None  # type: ignore
 
-def cmd_eval(args: argparse.Namespace):
     ds = _load_any_dataset(args)
     _, _, q_field, a_field = get_fields(
         ds, text_field=args.text_field, question_field=args.question_field, answer_field=args.answer_field, require_text=False
     )
     if not q_field or not a_field:
         raise ValueError("Need --question-field and --answer-field (or auto-detected) for eval")
+    ds = ds.select_columns([q_field, a_field])
 
     rag = RAGPipeline(top_k=args.top_k, llm=getattr(args, 'llm', None))
     n = len(ds) if args.limit is None else min(args.limit, len(ds))
-    total = 0
-    correct = 0
-    preds = []
-    refs = []
-
-    for i in tqdm(range(n), desc="Evaluating"):
-        row = ds[i]
-        q = row[q_field]
-        gold = row[a_field]
-        res = rag.answer(q, top_k=args.top_k)
-        pred = res["answer"]
-        # simple contains lexical matching
-        if _normalize(gold) and _normalize(gold) in _normalize(pred):
-            correct += 1
-        total += 1
-        preds.append(pred)
-        refs.append(gold)
-
-    acc = correct / max(total, 1)
-    out = {"total": total, "correct": correct, "accuracy_contains": acc}
+    done = load_done(args.out) if args.resume else set()
+    todo = [i for i in range(n) if i not in done]
+    if done:
+        print(f"[eval] Resuming: {n - len(todo)} of {n} questions already in {args.out}.")
+
+    backend = (getattr(args, "llm", None) or settings.chat_backend or "ollama").lower()
+    rate = args.rate if args.rate is not None else parse_rate_limits(settings.eval_rate_limits).get(backend)
+
+    def rows():
+        for i in todo:
+            row = ds[i]
+            yield i, row[q_field], row[a_field]
+
+    progress = tqdm(total=len(todo), desc="Evaluating")
+    writer = ResultWriter(args.out, resume=args.resume)
+    try:
+        run_eval(
+            rows(),
+            # One embedding call and one collection query per batch of questions
+            lambda qs: rag.retrieve_many(qs, top_k=args.top_k),
+            rag.generate,
+            writer,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            limiter=RateLimiter(rate),
+            on_done=lambda: progress.update(1),
+        )
+    finally:
+        writer.close()
+        progress.close()
+
+    rouge = None
     if rouge_l_corpus is not None:
-        try:
-            rouge = rouge_l_corpus(preds, refs)
-            out.update(rouge)
-        except Exception:
-            pass
+        rouge = lambda preds, refs: rouge_l_corpus(preds, refs, workers=args.rouge_workers)  # noqa: E731
+    out = score_results(args.out, indices=set(range(n)), rouge=rouge)
     print(out)
 
 
@@ -170,9 +330,59 @@ def build_parser() -> argparse.ArgumentParser:
     ping.add_argument("--id-field", default=None)
     ping.add_argument("--chunk-size", type=int, default=None)
     ping.add_argument("--chunk-overlap", type=int, default=None)
-    ping.add_argument("--batch-size", type=int, default=16)
+    ping.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding call; split into EMBED_BATCH_SIZE requests sent EMBED_CONCURRENCY at a time")
+    ping.add_argument("--write-batch-size", type=int, default=1024, help="Chunks per Chroma write")
+    ping.add_argument("--queue-size", type=int, default=4, help="Batches buffered between chunking, embedding and writing")
+    ping.add_argument("--incremental", action="store_true", help="Upsert only rows whose content changed and delete chunks of removed or shrunk rows")
+    ping.add_argument("--embedding-cache", default=None, help="Embedding cache file (default: EMBEDDING_CACHE_PATH)")
+    ping.add_argument("--no-embedding-cache", action="store_true", help="Embed every chunk, bypassing the embedding cache")
     ping.set_defaults(func=cmd_ingest)
 
+    pc = sub.add_parser("embcache", help="Show or prune the persistent embedding cache")
+    pc.add_argument("action", choices=["stats", "prune"])
+    pc.add_argument("--path", default=None, help="Embedding cache file (default: EMBEDDING_CACHE_PATH)")
+    pc.add_argument("--max-age-days", type=float, default=None, help="Drop entries not used for this many days")
+    pc.add_argument("--max-entries", type=int, default=None, help="Keep only the most recently used N entries")
+    pc.add_argument("--model", default=None, help="Limit pruning to one embedding model")
+    pc.set_defaults(func=cmd_embcache)
+
+    ps = sub.add_parser("snapshot", help="Save the collection as a .npy snapshot for VECTOR_BACKEND=numpy")
+    ps.add_argument("--out", default=None, help="Snapshot file (default: NUMPY_SNAPSHOT_PATH)")
+    ps.set_defaults(func=cmd_snapshot)
+
+    pb = sub.add_parser("bench", help="Run component micro-benchmarks and check them against a baseline")
+    pb.add_argument("--only", default=None, help="Comma-separated suites: chunking,embed,chroma,prompt,rouge,imports (default: all)")
+    pb.add_argument("--sizes", default="1000,10000", help="Corpus sizes for the Chroma query benchmark")
+    pb.add_argument("--out", default="bench_results.json", help="Write results to this JSON file")
+    pb.add_argument("--baseline", default="benchmarks/baseline.json", help="Baseline JSON to compare against")
+    pb.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression per metric (0.25 = 25%%)")
+    pb.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline instead of comparing")
+    pb.set_defaults(func=cmd_bench)
+
+    pl = sub.add_parser("loadtest", help="Drive a running chat server's /api/chat and report throughput and latency")
+    pl.add_argument("--url", default="http://localhost:7865", help="Server base URL")
+    pl.add_argument("--concurrency", type=int, default=8, help="Concurrent users (closed loop) or workers (with --rate)")
+    pl.add_argument("--rate", type=float, default=None, help="Open loop: Poisson arrivals per second instead of back-to-back requests")
+    pl.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    pl.add_argument("--requests", type=int, default=None, help="Stop after this many requests")
+    pl.add_argument("--stream", action="store_true", help="Use /api/chat/stream and report time to first token")
+    pl.add_argument("--questions", default=None, help="Text file with one question per line")
+    pl.add_argument("--top-k", type=int, default=settings.top_k)
+    pl.add_argument("--llm", choices=["ollama", "gemini", "cerebras"], default=None)
+    pl.add_argument("--timeout", type=float, default=120.0)
+    pl.add_argument("--out", default=None, help="Also write the report to this JSON file")
+    pl.set_defaults(func=cmd_loadtest)
+
+    pf = sub.add_parser("fake-ollama", help="Serve a local stand-in for Ollama's chat and embedding API")
+    pf.add_argument("--host", default="127.0.0.1")
+    pf.add_argument("--port", type=int, default=11435)
+    pf.add_argument("--dim", type=int, default=1024, help="Embedding size (bge-m3 is 1024)")
+    pf.add_argument("--embed-latency", type=float, default=0.01, help="Seconds per embedding request")
+    pf.add_argument("--chat-latency", type=float, default=0.3, help="Seconds until the first answer token")
+    pf.add_argument("--tokens-per-s", type=float, default=50.0, help="Answer token rate (0 = instant)")
+    pf.add_argument("--max-tokens", type=int, default=128, help="Tokens per answer")
+    pf.set_defaults(func=cmd_fake_ollama)
+
     pq = sub.add_parser("query", help="Ask a question against the indexed KB")
     pq.add_argument("--question", required=True)
     pq.add_argument("--top-k", type=int, default=settings.top_k)
@@ -189,7 +399,13 @@ def build_parser() -> argparse.ArgumentParser:
     pe.add_argument("--answer-field", default=None)
     pe.add_argument("--top-k", type=int, default=settings.top_k)
     pe.add_argument("--limit", type=int, default=None)
+    pe.add_argument("--batch-size", type=int, default=32, help="Questions retrieved per batched embedding/collection call")
     pe.add_argument("--llm", choices=["ollama", "gemini", "cerebras"], default=None, help="Choose chat backend (overrides CHAT_BACKEND)")
+    pe.add_argument("--concurrency", type=int, default=1, help="Questions generated in parallel")
+    pe.add_argument("--rate", type=float, default=None, help="Max generation requests per second (default: EVAL_RATE_LIMITS for the backend)")
+    pe.add_argument("--out", default="eval_results.jsonl", help="Per-question results file (JSONL); metrics are computed from it")
+    pe.add_argument("--rouge-workers", type=int, default=None, help="Processes used to score ROUGE-L")
+    pe.add_argument("--resume", action="store_true", help="Append to --out and skip questions already recorded there")
     pe.set_defaults(func=cmd_eval)
 
     return p
@@ -12,6 +12,14 @@ class Settings:
     ollama_base_url: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:7860")
     generation_model: str = os.getenv("GENERATION_MODEL", "gpt-oss:20b")
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "bge-m3:latest")
+    # Embedding client: texts per /api/embed request, concurrent requests in
+    # flight, and retries (with exponential backoff) per failing batch.
+    embed_batch_size: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    embed_concurrency: int = int(os.getenv("EMBED_CONCURRENCY", "4"))
+    embed_max_retries: int = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+    # How long Ollama keeps models loaded after a request: a duration such as
+    # "30m", seconds, or -1 for forever; empty uses the server default (5m).
+    ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
 
     # Gemini / API
     # Default to public Google Generative Language API v1 endpoint
@@ -23,8 +31,37 @@ class Settings:
     cerebras_api_key: str = os.getenv("CEREBRAS_API_KEY", "")
     cerebras_model: str = os.getenv("CEREBRAS_MODEL", "llama-4-scout-17b-16e-instruct")
 
+    # Opt-in request profiling in the FastAPI app: profile every Nth chat
+    # request (0 = off) and/or requests sent with `X-Debug-Profile: 1` when
+    # PROFILE_HEADER=1. The last PROFILE_BUFFER_SIZE profiles are kept;
+    # stacks are sampled every PROFILE_INTERVAL seconds.
+    profile_every_n: int = int(os.getenv("PROFILE_EVERY_N", "0"))
+    profile_header: bool = os.getenv("PROFILE_HEADER", "0").lower() in ("1", "true", "yes")
+    profile_buffer_size: int = int(os.getenv("PROFILE_BUFFER_SIZE", "20"))
+    profile_interval: float = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+    # Web app startup: preload the collection/indexes and load the embedding
+    # and chat models before reporting /ready (WARMUP=0 skips it and is
+    # ready at once). Failed steps are retried every WARMUP_RETRY seconds;
+    # models are pinged every WARMUP_REFRESH_INTERVAL seconds (0 = never)
+    # so Ollama keeps them resident.
+    warmup: bool = os.getenv("WARMUP", "1").lower() in ("1", "true", "yes")
+    warmup_chat: bool = os.getenv("WARMUP_CHAT", "1").lower() in ("1", "true", "yes")
+    warmup_retry: float = float(os.getenv("WARMUP_RETRY", "10"))
+    warmup_refresh_interval: float = float(os.getenv("WARMUP_REFRESH_INTERVAL", "240"))
+
+    # Connection pool size of the shared async HTTP client (FastAPI app)
+    http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+
     # Default chat backend: 'ollama', 'gemini', or 'cerebras'
     chat_backend: str = os.getenv("CHAT_BACKEND", "ollama")
+    # Web apps keep per-backend pipelines for requests that pick an `llm`:
+    # at most PIPELINE_CACHE_SIZE, each dropped after PIPELINE_IDLE_TTL idle seconds.
+    pipeline_cache_size: int = int(os.getenv("PIPELINE_CACHE_SIZE", "16"))
+    pipeline_idle_ttl: float = float(os.getenv("PIPELINE_IDLE_TTL", "900"))
+    # `tonrag eval` generation rate caps per backend in requests/second,
+    # e.g. "gemini=1,cerebras=5"; unlisted backends are unlimited.
+    eval_rate_limits: str = os.getenv("EVAL_RATE_LIMITS", "")
 
     # Vector store
     # Default to the DB built by scripts/build_vector_db.py
@@ -33,6 +70,19 @@ class Settings:
     # Query mode: 'text' uses Chroma's embedding function (if configured),
     # 'embed' uses our embedding client, 'auto' tries text then falls back to embed.
     chroma_query_mode: str = os.getenv("CHROMA_QUERY_MODE", "auto")
+    # Query backend: 'chroma' (HNSW) or 'numpy' (exact search over an in-memory
+    # copy of the collection, optionally warm-started from a .npy snapshot)
+    vector_backend: str = os.getenv("VECTOR_BACKEND", "chroma")
+    numpy_snapshot_path: str = os.getenv("NUMPY_SNAPSHOT_PATH", "")
+    # Seconds the per-collection counts shown by debug endpoints are reused
+    chroma_stats_ttl: float = float(os.getenv("CHROMA_STATS_TTL", "30"))
+
+    # Persistent embedding cache used by ingestion (SQLite file; empty disables)
+    embedding_cache_path: str = os.getenv("EMBEDDING_CACHE_PATH", os.path.abspath("./data/embedding_cache.sqlite"))
+
+    # Parquet copies of dataset CSVs (re-made when the CSV's mtime changes;
+    # used when pyarrow is installed; empty disables)
+    dataset_cache_dir: str = os.getenv("DATASET_CACHE_DIR", os.path.abspath("./data/cache"))
 
     # Chunking
     chunk_size: int = int(os.getenv("CHUNK_SIZE", "800"))
@@ -40,6 +90,63 @@ class Settings:
 
     # Retrieval
     top_k: int = int(os.getenv("TOP_K", "5"))
+    # In-process retrieval cache (query -> embedding, (embedding, top_k) -> hits).
+    # Size 0 disables it; TTL in seconds (0 = no expiry). The collection count
+    # is re-checked at most every RETRIEVAL_CACHE_CHECK_INTERVAL seconds.
+    retrieval_cache_size: int = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+    retrieval_cache_ttl: float = float(os.getenv("RETRIEVAL_CACHE_TTL", "3600"))
+    retrieval_cache_check_interval: float = float(os.getenv("RETRIEVAL_CACHE_CHECK_INTERVAL", "5"))
+    # Retrieval mode: 'dense' (embeddings), 'lexical' (in-process BM25, no
+    # network) or 'hybrid' (both, merged by reciprocal-rank fusion with
+    # constant RRF_K). In hybrid mode the dense half is abandoned after
+    # HYBRID_DENSE_TIMEOUT seconds (0 = wait) and BM25 results are used.
+    # The BM25 index is saved to LEXICAL_INDEX_PATH (default:
+    # <CHROMA_DIR>/<collection>.bm25.json).
+    retrieval_mode: str = os.getenv("RETRIEVAL_MODE", "dense")
+    lexical_index_path: str = os.getenv("LEXICAL_INDEX_PATH", "")
+    rrf_k: int = int(os.getenv("RRF_K", "60"))
+    hybrid_dense_timeout: float = float(os.getenv("HYBRID_DENSE_TIMEOUT", "1.5"))
+    # Context assembly: hits are packed into the prompt up to
+    # CONTEXT_TOKEN_BUDGET estimated tokens (0 = unlimited); hits farther
+    # than CONTEXT_MAX_DISTANCE_RATIO x the best hit's distance are dropped
+    # (0 = keep all), and `reference:` lines are cut to
+    # CONTEXT_REFERENCE_CHARS characters (0 = keep).
+    context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+    context_max_distance_ratio: float = float(os.getenv("CONTEXT_MAX_DISTANCE_RATIO", "0"))
+    context_reference_chars: int = int(os.getenv("CONTEXT_REFERENCE_CHARS", "200"))
+    # CONTEXT_DIVERSITY=1 MMR-reorders hits over their stored embeddings
+    # (relevance weight CONTEXT_MMR_LAMBDA) and drops hits whose cosine to
+    # a kept one reaches CONTEXT_DUPLICATE_THRESHOLD. CONTEXT_FIELDS=answer
+    # sends only each QA record's answer plus a short citation ('full' sends
+    # question/answer/reference).
+    context_diversity: bool = os.getenv("CONTEXT_DIVERSITY", "0").lower() in ("1", "true", "yes")
+    context_mmr_lambda: float = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+    context_duplicate_threshold: float = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.97"))
+    context_fields: str = os.getenv("CONTEXT_FIELDS", "full").lower()
+    # Exact-question lookup: verbatim dataset questions are answered with the
+    # curated answer, skipping embedding and generation. 'store' indexes the
+    # collection's question/answer documents, a path indexes that dataset CSV
+    # (Manually review answers preferred); empty disables. With
+    # QUESTION_LOOKUP_CONTEXTS=1 retrieved contexts are still attached.
+    question_lookup: str = os.getenv("QUESTION_LOOKUP", "")
+    question_lookup_contexts: bool = os.getenv("QUESTION_LOOKUP_CONTEXTS", "0").lower() in ("1", "true", "yes")
+    # Semantic answer cache: reuse a generated answer when a question embeds
+    # within ANSWER_CACHE_THRESHOLD cosine of a cached one and retrieves the
+    # same documents. Size 0 (default) disables it; TTL in seconds.
+    answer_cache_size: int = int(os.getenv("ANSWER_CACHE_SIZE", "0"))
+    answer_cache_ttl: float = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+    answer_cache_threshold: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
 
 
 settings = Settings()
+
+
+def ollama_keep_alive():
+    """OLLAMA_KEEP_ALIVE as Ollama expects it (int seconds or duration string), or None."""
+    value = (settings.ollama_keep_alive or "").strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return value
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .lookup import parse_qa_record
+
+# Rough chars-per-token for Vietnamese text under the BPE tokenizers we
+# serve (gpt-oss, Llama, Gemini); good enough to bound prompt size.
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def trim_reference(doc: str, max_chars: int) -> str:
+    """Cut `reference:` lines of a QA document to `max_chars` characters (0 = keep)."""
+    if max_chars <= 0 or "reference:" not in (doc or "").lower():
+        return doc
+    lines = []
+    for line in doc.splitlines():
+        head, sep, tail = line.partition(":")
+        if sep and head.strip().lower() == "reference" and len(tail.strip()) > max_chars:
+            line = f"{head}: {tail.strip()[:max_chars].rstrip()}…"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def answer_only(doc: str, reference_chars: int = 0) -> str:
+    """A QA document reduced to its answer plus a short source citation.
+
+    Documents without an `answer:` field are returned unchanged.
+    """
+    rec = parse_qa_record(doc)
+    if not rec["answer"]:
+        return doc
+    ref = rec["reference"]
+    if reference_chars > 0 and len(ref) > reference_chars:
+        ref = ref[:reference_chars].rstrip() + "…"
+    return f"{rec['answer']} (Tham khảo: {ref})" if ref else rec["answer"]
+
+
+def cosine_relevance(query: Sequence[float], embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+    """Cosine of each embedding to the query embedding."""
+    mat = np.asarray(embeddings, dtype=np.float32)
+    q = np.asarray(query, dtype=np.float32)
+    return (mat @ q) / np.maximum(np.linalg.norm(mat, axis=1) * np.linalg.norm(q), 1e-12)
+
+
+def mmr_order(
+    relevance: Sequence[float],
+    embeddings: Sequence[Sequence[float]],
+    lam: float = 0.7,
+    duplicate_threshold: float = 1.0,
+) -> Tuple[List[int], List[int]]:
+    """Maximal marginal relevance over hit embeddings.
+
+    Greedily picks the hit maximizing `lam * relevance - (1 - lam) * max
+    cosine to the hits already picked`; the similarity matrix is one
+    matrix product. A hit whose cosine to a picked hit reaches
+    `duplicate_threshold` is set aside as a near-duplicate. Returns
+    (picked indices in order, duplicate indices).
+    """
+    rel = np.asarray(relevance, dtype=np.float32)
+    n = rel.shape[0]
+    if n == 0:
+        return [], []
+    emb = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    emb = emb / np.where(norms == 0, 1.0, norms)
+    sims = emb @ emb.T
+    max_sim = np.full(n, -np.inf, dtype=np.float32)
+    left = np.ones(n, dtype=bool)
+    picked: List[int] = []
+    duplicates: List[int] = []
+    for _ in range(n):
+        if picked:
+            score = lam * rel - (1.0 - lam) * max_sim
+        else:
+            score = rel.copy()
+        score[~left] = -np.inf
+        i = int(np.argmax(score))
+        left[i] = False
+        if picked and max_sim[i] >= duplicate_threshold:
+            duplicates.append(i)
+            continue
+        picked.append(i)
+        np.maximum(max_sim, sims[i], out=max_sim)
+    return picked, duplicates
+
+
+@dataclass
+class AssembledContext:
+    """Hits chosen for a prompt, their prompt texts, and what was left out."""
+
+    hits: List[Dict[str, Any]] = field(default_factory=list)
+    texts: List[str] = field(default_factory=list)
+    # {"id": ..., "reason": "duplicate" | "distance" | "budget"}
+    dropped: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+
+
+def assemble_context(
+    hits: List[Dict[str, Any]],
+    token_budget: int = 0,
+    max_distance_ratio: float = 0.0,
+    reference_chars: int = 0,
+    fields: str = "full",
+) -> AssembledContext:
+    """Pick the retrieved hits that go into the prompt, in rank order.
+
+    - Adaptive k: with `max_distance_ratio` > 0, hits whose distance is
+      more than that multiple of the best hit's are dropped. Hits without
+      a distance (BM25) are kept.
+    - `reference_chars` trims long `reference:` tails; with `fields`
+      "answer" only the answer and a short citation are sent.
+    - `token_budget` (estimated tokens, 0 = unlimited) is filled in rank
+      order; a hit that does not fit is skipped so a shorter one below it
+      can still be used. The top hit is always kept, cut to the budget if
+      it alone exceeds it.
+    """
+    out = AssembledContext()
+    distances = [h.get("distance") for h in hits if isinstance(h.get("distance"), (int, float))]
+    best = min(distances) if distances else None
+    limit = best * max_distance_ratio if best is not None and best > 1e-6 and max_distance_ratio > 0 else None
+
+    for hit in hits:
+        d = hit.get("distance")
+        if limit is not None and isinstance(d, (int, float)) and d > limit and out.hits:
+            out.dropped.append({"id": hit.get("id"), "reason": "distance"})
+            continue
+        doc = hit.get("document") or ""
+        text = answer_only(doc, reference_chars) if fields == "answer" else trim_reference(doc, reference_chars)
+        cost = estimate_tokens(text)
+        if token_budget > 0 and out.tokens + cost > token_budget:
+            if out.hits:
+                out.dropped.append({"id": hit.get("id"), "reason": "budget"})
+                continue
+            text = text[: token_budget * CHARS_PER_TOKEN]
+            cost = estimate_tokens(text)
+        out.hits.append(hit)
+        out.texts.append(text)
+        out.tokens += cost
+    return out
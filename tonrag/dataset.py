@@ -1,12 +1,19 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterator, List, Tuple, Optional
+import contextlib
+import csv
+import glob
+import hashlib
 import os
-import pandas as pd
-from datasets import load_dataset
+
+from .config import settings
 
 
 def load_hf_dataset(name: str, split: str):
+    # `datasets` takes seconds to import; only HF-backed commands need it
+    from datasets import load_dataset
+
     return load_dataset(name, split=split)
 
 
@@ -94,28 +101,204 @@ def get_fields(
 
 
 class SimpleDataset:
-    """Lightweight wrapper to make a pandas DataFrame look like a HF dataset
-    for the limited interface we need: `.features`, `__len__`, and `__getitem__`.
+    """Lightweight stand-in for a HF dataset with the limited interface we
+    need: `.features`, `__len__`, `__getitem__` (a row dict) and
+    `select_columns`. Values are stored per column, so a row dict is only
+    built when a row is read.
     """
 
     def __init__(self, rows: List[Dict[str, Any]]):
-        self._rows = rows
         columns = list(rows[0].keys()) if rows else []
+        self._set_columns({c: [r.get(c) for r in rows] for c in columns})
+
+    @classmethod
+    def from_columns(cls, data: Dict[str, List[Any]]) -> "SimpleDataset":
+        ds = cls.__new__(cls)
+        ds._set_columns(data)
+        return ds
+
+    def _set_columns(self, data: Dict[str, List[Any]]):
+        self._columns = data
+        self._len = len(next(iter(data.values()))) if data else 0
         # mimic feature map behavior for membership checks and keys()
-        self.features = {c: True for c in columns}
+        self.features = {c: True for c in data}
 
     def __len__(self):
-        return len(self._rows)
+        return self._len
 
     def __getitem__(self, idx: int) -> Dict[str, Any]:
-        return self._rows[idx]
+        return {c: values[idx] for c, values in self._columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        names = list(self._columns)
+        for values in zip(*self._columns.values()):
+            yield dict(zip(names, values))
+
+    def select_columns(self, columns: List[str]) -> "SimpleDataset":
+        """The same rows restricted to `columns` (lists are shared, not copied)."""
+        return SimpleDataset.from_columns({c: self._columns[c] for c in columns})
+
+
+def read_csv_header(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return next(csv.reader(f), [])
+
 
+def iter_csv_rows(path: str, columns: Optional[List[str]] = None) -> Iterator[Dict[str, str]]:
+    """Stream rows of a CSV as dicts of strings, keeping only `columns` if given."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        wanted = columns or header
+        pos = [header.index(c) for c in wanted]
+        for rec in reader:
+            if not rec:
+                continue
+            yield {c: (rec[p] if p < len(rec) else "") for c, p in zip(wanted, pos)}
+
+
+def _read_csv_columns(path: str, columns: List[str]) -> Dict[str, List[str]]:
+    data: Dict[str, List[str]] = {c: [] for c in columns}
+    for row in iter_csv_rows(path, columns):
+        for c in columns:
+            data[c].append(row[c])
+    return data
+
+
+def parquet_cache_path(path: str, cache_dir: str) -> str:
+    """Cache file for `path`, keyed on its location, mtime and size."""
+    st = os.stat(path)
+    src = os.path.abspath(path)
+    tag = hashlib.sha1(src.encode("utf-8")).hexdigest()[:10]
+    stem = os.path.splitext(os.path.basename(src))[0]
+    return os.path.join(cache_dir, f"{stem}-{tag}-{st.st_mtime_ns}-{st.st_size}.parquet")
+
+
+def _read_parquet_columns(path: str, columns: List[str], cache_dir: str) -> Optional[Dict[str, List[str]]]:
+    """Projected columns via a Parquet copy of the CSV; None if pyarrow is missing.
+
+    The first load converts the whole CSV (all columns as strings, like the
+    csv module would give) and later loads read only the requested columns.
+    Editing the CSV changes its mtime, so a fresh copy is written and older
+    copies of the same file are removed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    cached = parquet_cache_path(path, cache_dir)
+    try:
+        if os.path.exists(cached):
+            table = pq.read_table(cached, columns=columns)
+            return {c: table.column(c).to_pylist() for c in columns}
+    except (pa.ArrowException, OSError):
+        # Removed by another process or unreadable: convert again
+        pass
+    header = read_csv_header(path)
+    try:
+        table = pacsv.read_csv(
+            path,
+            # QA cells (references) span several lines
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={c: pa.string() for c in header},
+                strings_can_be_null=False,
+            ),
+        )
+    except pa.ArrowException:
+        # Arrow is stricter than the csv module (e.g. ragged rows); let that read it
+        return None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        prefix = cached.rsplit("-", 2)[0]
+        for old in glob.glob(glob.escape(prefix) + "-*.parquet"):
+            if old != cached:
+                # Another process converting the same CSV may have removed it
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(old)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, cached)
+    except OSError:
+        # A read-only cache dir only costs the next load a conversion
+        pass
+    table = table.select(columns)
+    return {c: table.column(c).to_pylist() for c in columns}
 
-def load_csv_dataset(path: str) -> SimpleDataset:
+
+class CSVDataset(SimpleDataset):
+    """SimpleDataset over a CSV file whose values are read on first access.
+
+    `features` comes from the header alone; `select_columns` before the
+    first row access limits the read to those columns. Values are strings
+    (empty cells are ""). With pyarrow installed the data is read from a
+    Parquet copy under `cache_dir` (see `_read_parquet_columns`), otherwise
+    the CSV is streamed with the csv module. Iterating an unloaded dataset
+    streams rows without keeping them.
+    """
+
+    def __init__(self, path: str, columns: Optional[List[str]] = None, cache_dir: Optional[str] = None):
+        self.path = path
+        self.cache_dir = settings.dataset_cache_dir if cache_dir is None else cache_dir
+        header = read_csv_header(path)
+        missing = [c for c in (columns or []) if c not in header]
+        if missing:
+            raise ValueError(f"Columns {missing} not in CSV. Available: {header}")
+        self._names = list(columns or header)
+        self.features = {c: True for c in self._names}
+        self._columns: Optional[Dict[str, List[Any]]] = None
+
+    def _data(self) -> Dict[str, List[Any]]:
+        if self._columns is None:
+            data = None
+            if self.cache_dir:
+                data = _read_parquet_columns(self.path, self._names, self.cache_dir)
+            if data is None:
+                data = _read_csv_columns(self.path, self._names)
+            self._set_columns(data)
+        return self._columns
+
+    def __len__(self):
+        self._data()
+        return self._len
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        self._data()
+        return super().__getitem__(idx)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._columns is None:
+            return iter_csv_rows(self.path, self._names)
+        return super().__iter__()
+
+    def row_count_hint(self) -> Optional[int]:
+        """Number of rows if known without reading the data (loaded, or a fresh Parquet copy)."""
+        if self._columns is not None:
+            return self._len
+        if self.cache_dir:
+            cached = parquet_cache_path(self.path, self.cache_dir)
+            if os.path.exists(cached):
+                try:
+                    import pyarrow.parquet as pq
+                except ImportError:
+                    return None
+                return pq.ParquetFile(cached).metadata.num_rows
+        return None
+
+    def select_columns(self, columns: List[str]) -> SimpleDataset:
+        if self._columns is not None:
+            return super().select_columns(columns)
+        return CSVDataset(self.path, columns=columns, cache_dir=self.cache_dir)
+
+
+def load_csv_dataset(path: str, columns: Optional[List[str]] = None, cache_dir: Optional[str] = None) -> CSVDataset:
+    """Lazily loaded CSV dataset, optionally limited to `columns`.
+
+    `cache_dir` holds the Parquet copies (default DATASET_CACHE_DIR; "" reads
+    the CSV directly every time).
+    """
     if not os.path.exists(path):
         raise FileNotFoundError(f"CSV not found: {path}")
-    df = pd.read_csv(path)
-    # Convert NaNs to empty strings for robustness in chunking
-    df = df.fillna("")
-    rows: List[Dict[str, Any]] = df.to_dict(orient="records")
-    return SimpleDataset(rows)
+    return CSVDataset(path, columns=columns, cache_dir=cache_dir)
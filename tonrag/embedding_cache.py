@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from .config import settings
+from .embeddings import Embeddings
+
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_SQL_CHUNK = 500
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding store keyed by (model name, sha256 of text).
+
+    Vectors are stored as float32 blobs in a single SQLite file, so a
+    re-ingest only needs to embed chunks whose text (or model) changed.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " vec BLOB NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        keys = [text_key(t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), _SQL_CHUNK):
+                part = unique[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE model = ? AND key IN ({marks})",
+                    [model, *part],
+                ).fetchall()
+                for key, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[key] = vec.tolist()
+                if rows:
+                    hit_marks = ",".join("?" * len(rows))
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE model = ? AND key IN ({hit_marks})",
+                        [now, model, *[r[0] for r in rows]],
+                    )
+            self._conn.commit()
+        return [found.get(k) for k in keys]
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        now = time.time()
+        rows = [
+            (model, text_key(t), len(v), array("f", v).tobytes(), now, now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, dim, vec, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def size(self) -> Dict:
+        """Entry counts per model plus the on-disk footprint in bytes."""
+        with self._lock:
+            per_model = dict(self._conn.execute("SELECT model, COUNT(*) FROM embeddings GROUP BY model").fetchall())
+        disk = 0
+        for suffix in ("", "-wal", "-shm"):
+            p = self.path + suffix
+            if os.path.exists(p):
+                disk += os.path.getsize(p)
+        return {"path": self.path, "entries": sum(per_model.values()), "models": per_model, "bytes": disk}
+
+    def prune(
+        self,
+        max_age_days: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        model: Optional[str] = None,
+    ) -> int:
+        """Delete entries unused for `max_age_days`, then keep at most the
+        `max_entries` most recently used. Returns the number of rows removed."""
+        removed = 0
+        scope = " AND model = ?" if model else ""
+        scope_args = [model] if model else []
+        with self._lock:
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400.0
+                cur = self._conn.execute(f"DELETE FROM embeddings WHERE last_used < ?{scope}", [cutoff, *scope_args])
+                removed += cur.rowcount
+            if max_entries is not None:
+                where = "WHERE model = ?" if model else ""
+                cur = self._conn.execute(
+                    f"DELETE FROM embeddings WHERE rowid IN ("
+                    f" SELECT rowid FROM embeddings {where} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    [*scope_args, max(0, int(max_entries))],
+                )
+                removed += cur.rowcount
+            self._conn.commit()
+            if removed:
+                self._conn.execute("VACUUM")
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an embeddings client so only texts missing from the cache are embedded."""
+
+    def __init__(self, inner: Embeddings, cache: EmbeddingCache, model: Optional[str] = None):
+        self.inner = inner
+        self.cache = cache
+        self.model = model or getattr(inner, "model", None) or type(inner).__name__
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        out = self.cache.get_many(self.model, texts)
+        missing: Dict[str, List[int]] = {}
+        for i, vec in enumerate(out):
+            if vec is None:
+                missing.setdefault(texts[i], []).append(i)
+        self.hits += len(texts) - sum(len(v) for v in missing.values())
+        self.misses += len(missing)
+        if missing:
+            todo = list(missing.keys())
+            vectors = self.inner.embed_documents(todo)
+            self.cache.put_many(self.model, todo, vectors)
+            for text, vec in zip(todo, vectors):
+                for i in missing[text]:
+                    out[i] = vec
+        return out  # type: ignore[return-value]
+
+
+def get_default_embedding_cache(path: Optional[str] = None) -> Optional[EmbeddingCache]:
+    """Open the cache at `path` (or EMBEDDING_CACHE_PATH); None if disabled."""
+    path = path if path is not None else settings.embedding_cache_path
+    if not path:
+        return None
+    return EmbeddingCache(path)
@@ -1,10 +1,46 @@
 from __future__ import annotations
 
+import asyncio
+import threading
 import time
-from typing import Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
 
-from .config import settings
+from .aio import get_async_client
+from .config import ollama_keep_alive, settings
+
+
+def _embed_route_missing(resp) -> bool:
+    """True for a 404 meaning "no /api/embed here" (old server), not "no such model".
+
+    Ollama answers 404 with {"error": "model ... not found"} for unknown or
+    not-yet-pulled models on both endpoints; that must surface as an error
+    instead of switching to the legacy endpoint.
+    """
+    if resp.status_code != 404:
+        return False
+    try:
+        error = str(resp.json().get("error") or "")
+    except ValueError:
+        error = resp.text or ""
+    return "model" not in error.lower()
+
+
+def _retry_policy(exc: Exception, timeouts: tuple) -> Tuple[bool, bool]:
+    """(retry, split) for a failed embedding request.
+
+    Client errors (4xx other than 408/413/429) are deterministic and raised
+    at once. Only timeouts, 413 and 5xx -- the failures a smaller payload
+    can fix -- split the batch; anything else is retried as is.
+    """
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        if 400 <= status < 500 and status not in (408, 413, 429):
+            return False, False
+        return True, status in (408, 413) or status >= 500
+    return True, isinstance(exc, timeouts)
 
 
 class Embeddings:
@@ -14,35 +50,190 @@ class Embeddings:
     def embed_query(self, text: str) -> List[float]:
         return self.embed_documents([text])[0]
 
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Default: run the blocking client on a worker thread
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
 
 class OllamaEmbeddings(Embeddings):
-    """Calls Ollama native embeddings endpoint.
+    """Calls Ollama native embeddings endpoints.
 
-    POST {base}/api/embeddings
-    body: {"model": <embed_model>, "prompt": <text>}
-    returns: {"embedding": [..]}
+    POST {base}/api/embed
+    body: {"model": <embed_model>, "input": [<text>, ...]}
+    returns: {"embeddings": [[..], ...]}
+
+    Texts are sent in batches over a pooled keep-alive session (or the
+    shared async client for `aembed_*`), with up to `concurrency` batches
+    in flight. A failing batch is retried with
+    exponential backoff; timeouts, 413 and 5xx also split it in half and
+    shrink the working batch size, which grows back after successes.
+    Other 4xx errors are raised without retrying. Older Ollama servers
+    without `/api/embed` fall back to one `/api/embeddings` call per text.
     """
 
-    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None, timeout: int = 120):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        timeout: int = 120,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff: float = 0.5,
+    ):
         self.base_url = (base_url or settings.ollama_base_url).rstrip("/")
         self.model = model or settings.embedding_model
         self.timeout = timeout
+        self.max_batch_size = max(1, batch_size or settings.embed_batch_size)
+        self.concurrency = max(1, concurrency or settings.embed_concurrency)
+        self.max_retries = max(0, settings.embed_max_retries if max_retries is None else max_retries)
+        self.backoff = backoff
+
+        self._batch_size = self.max_batch_size
+        self._streak = 0
+        self._legacy = False
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _body(self, field: str, value) -> dict:
+        body = {"model": self.model, field: value}
+        keep_alive = ollama_keep_alive()
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        return body
+
+    def _post_embed(self, texts: List[str]) -> List[List[float]]:
+        if not self._legacy:
+            url = f"{self.base_url}/api/embed"
+            resp = self._session.post(url, json=self._body("input", texts), timeout=self.timeout)
+            if not _embed_route_missing(resp):
+                resp.raise_for_status()
+                data = resp.json()
+                out = data.get("embeddings") or []
+                if len(out) != len(texts):
+                    raise RuntimeError(f"/api/embed returned {len(out)} embeddings for {len(texts)} inputs")
+                return out
+            # Server predates /api/embed; switch to the per-text endpoint for good
+            self._legacy = True
+        return [self._embed_one(t) for t in texts]
 
     def _embed_one(self, text: str) -> List[float]:
         url = f"{self.base_url}/api/embeddings"
-        resp = requests.post(url, json={"model": self.model, "prompt": text}, timeout=self.timeout)
+        resp = self._session.post(url, json=self._body("prompt", text), timeout=self.timeout)
         resp.raise_for_status()
         data = resp.json()
         return data["embedding"]
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        out: List[List[float]] = []
+    def _shrink(self, size: int):
+        with self._lock:
+            self._batch_size = max(1, min(self._batch_size, size // 2))
+            self._streak = 0
+
+    def _grow(self):
+        # Double the batch size again only after a run of clean requests
+        with self._lock:
+            self._streak += 1
+            if self._streak >= 4 and self._batch_size < self.max_batch_size:
+                self._batch_size = min(self.max_batch_size, self._batch_size * 2)
+                self._streak = 0
+
+    def _embed_batch(self, texts: List[str], attempt: int = 0) -> List[List[float]]:
+        # `attempt` carries over into the halves of a split batch, so one
+        # failing batch costs at most `max_retries` retries along any path
+        while True:
+            try:
+                out = self._post_embed(texts)
+                self._grow()
+                return out
+            except (requests.RequestException, ValueError, RuntimeError) as e:
+                retry, split = _retry_policy(e, (requests.Timeout,))
+                attempt += 1
+                if not retry or attempt > self.max_retries:
+                    raise
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+                if split and len(texts) > 1:
+                    # Large payloads are the usual culprit (timeouts, 413/500);
+                    # retry as two halves and use smaller batches from now on.
+                    self._shrink(len(texts))
+                    mid = len(texts) // 2
+                    return self._embed_batch(texts[:mid], attempt) + self._embed_batch(texts[mid:], attempt)
+
+    def _batches(self, texts: List[str]) -> Iterable[List[str]]:
+        size = self._batch_size
+        for i in range(0, len(texts), size):
+            yield texts[i:i + size]
+
+    async def _apost_embed(self, texts: List[str]) -> List[List[float]]:
+        client = get_async_client()
+        if not self._legacy:
+            url = f"{self.base_url}/api/embed"
+            resp = await client.post(url, json=self._body("input", texts), timeout=self.timeout)
+            if not _embed_route_missing(resp):
+                resp.raise_for_status()
+                out = resp.json().get("embeddings") or []
+                if len(out) != len(texts):
+                    raise RuntimeError(f"/api/embed returned {len(out)} embeddings for {len(texts)} inputs")
+                return out
+            # Server predates /api/embed; switch to the per-text endpoint for good
+            self._legacy = True
+        out = []
         for t in texts:
-            out.append(self._embed_one(t))
-            # small sleep to avoid hammering local server
-            time.sleep(0.01)
+            resp = await client.post(f"{self.base_url}/api/embeddings", json=self._body("prompt", t), timeout=self.timeout)
+            resp.raise_for_status()
+            out.append(resp.json()["embedding"])
         return out
 
+    async def _aembed_batch(self, texts: List[str], attempt: int = 0) -> List[List[float]]:
+        # Async twin of _embed_batch: same retry, backoff and splitting rules
+        import httpx  # already loaded by get_async_client
+
+        while True:
+            try:
+                out = await self._apost_embed(texts)
+                self._grow()
+                return out
+            except (httpx.HTTPError, ValueError, RuntimeError) as e:
+                retry, split = _retry_policy(e, (httpx.TimeoutException,))
+                attempt += 1
+                if not retry or attempt > self.max_retries:
+                    raise
+                await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+                if split and len(texts) > 1:
+                    self._shrink(len(texts))
+                    mid = len(texts) // 2
+                    return await self._aembed_batch(texts[:mid], attempt) + await self._aembed_batch(texts[mid:], attempt)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch: List[str]) -> List[List[float]]:
+            async with sem:
+                return await self._aembed_batch(batch)
+
+        results = await asyncio.gather(*(run(b) for b in self._batches(list(texts))))
+        return [vec for batch in results for vec in batch]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = list(self._batches(list(texts)))
+        if len(batches) == 1 or self.concurrency == 1:
+            out: List[List[float]] = []
+            for b in batches:
+                out.extend(self._embed_batch(b))
+            return out
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as pool:
+            results = list(pool.map(self._embed_batch, batches))
+        return [vec for batch in results for vec in batch]
+
 
 class SentenceTransformerEmbeddings(Embeddings):
     """Optional fallback using sentence-transformers if available locally.
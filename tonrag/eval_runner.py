@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """'gemini=1,cerebras=5' -> {'gemini': 1.0, 'cerebras': 5.0} (requests/second)."""
+    limits: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            limits[name.strip().lower()] = float(value)
+        except ValueError:
+            continue
+    return limits
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at most `rate` per second (<= 0 = unlimited)."""
+
+    def __init__(self, rate: Optional[float] = None):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def load_done(path: str) -> Set[int]:
+    """Row indices already recorded in a results file; a torn last line is ignored."""
+    done: Set[int] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(int(json.loads(line)["idx"]))
+            except Exception:
+                continue
+    return done
+
+
+def iter_results(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class ResultWriter:
+    """Appends one JSON line per finished question, flushed immediately."""
+
+    def __init__(self, path: str, resume: bool = False):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._f = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._f.tell() > 0:
+            # Start on a fresh line in case the previous run died mid-write
+            self._f.write("\n")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+def run_eval(
+    rows: Iterable[Tuple[int, str, str]],
+    retrieve_many: Callable[[List[str]], List[List[Dict]]],
+    generate: Callable[[str, List[Dict]], str],
+    writer: ResultWriter,
+    batch_size: int = 32,
+    concurrency: int = 1,
+    limiter: Optional[RateLimiter] = None,
+    on_done: Optional[Callable[[], None]] = None,
+) -> int:
+    """Answer (idx, question, gold) rows and stream one record per row to `writer`.
+
+    Retrieval stays batched; generations for a batch run on `concurrency`
+    threads, each waiting on `limiter` first. At most two batches of
+    generations are queued, so memory is bounded by `batch_size`.
+    Returns the number of records written.
+    """
+    written = 0
+
+    def work(idx: int, q: str, gold: str, hits: List[Dict], retrieve_s: float) -> None:
+        if limiter is not None:
+            limiter.acquire()
+        t0 = time.perf_counter()
+        pred = generate(q, hits)
+        writer.write({
+            "idx": idx,
+            "question": q,
+            "gold": gold,
+            "prediction": pred,
+            "contexts": [{"id": h.get("id"), "document": h.get("document")} for h in hits],
+            "retrieve_s": round(retrieve_s, 4),
+            "latency_s": round(time.perf_counter() - t0, 4),
+        })
+        if on_done is not None:
+            on_done()
+
+    def flush(batch: List[Tuple[int, str, str]]):
+        t0 = time.perf_counter()
+        hits_list = retrieve_many([q for _, q, _ in batch])
+        per_q = (time.perf_counter() - t0) / len(batch)
+        return [pool.submit(work, idx, q, gold, hits, per_q) for (idx, q, gold), hits in zip(batch, hits_list)]
+
+    pending: Set = set()
+    batch: List[Tuple[int, str, str]] = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="eval") as pool:
+        for row in rows:
+            batch.append(row)
+            if len(batch) < batch_size:
+                continue
+            while len(pending) >= 2 * batch_size:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    fut.result()
+                    written += 1
+            pending.update(flush(batch))
+            batch = []
+        if batch:
+            pending.update(flush(batch))
+        for fut in pending:
+            fut.result()
+            written += 1
+    return written
+
+
+def _normalize(s: str) -> str:
+    return (s or "").strip().lower()
+
+
+def score_results(path: str, indices: Optional[Set[int]] = None, rouge: Optional[Callable] = None) -> Dict[str, Any]:
+    """Metrics from a results file (optionally restricted to `indices`).
+
+    Later records of a row win, so a re-run question is counted once.
+    """
+    by_idx: Dict[int, Dict[str, Any]] = {}
+    for rec in iter_results(path):
+        idx = rec.get("idx")
+        if idx is None or (indices is not None and idx not in indices):
+            continue
+        by_idx[idx] = rec
+    recs = [by_idx[i] for i in sorted(by_idx)]
+    preds = [r.get("prediction") or "" for r in recs]
+    refs = [r.get("gold") or "" for r in recs]
+    correct = sum(1 for p, g in zip(preds, refs) if _normalize(g) and _normalize(g) in _normalize(p))
+    total = len(recs)
+    out: Dict[str, Any] = {"total": total, "correct": correct, "accuracy_contains": correct / max(total, 1)}
+    if total:
+        lat = sorted(float(r.get("latency_s") or 0.0) for r in recs)
+        out["latency_mean_s"] = sum(lat) / total
+        out["latency_p95_s"] = lat[min(total - 1, int(0.95 * total))]
+    if rouge is not None and total:
+        try:
+            out.update(rouge(preds, refs))
+        except Exception:
+            pass
+    return out
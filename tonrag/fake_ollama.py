@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+def fake_vector(text: str, dim: int) -> List[float]:
+    """Deterministic pseudo-embedding of `text` (same text, same vector)."""
+    rng = random.Random(hashlib.sha256((text or "").encode("utf-8")).digest())
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+_ANSWER = (
+    "Mẹ bầu nên khám thai định kỳ, bổ sung sắt và axit folic theo chỉ định của bác sĩ, "
+    "ăn uống đủ chất và nghỉ ngơi hợp lý [1]. Khi có dấu hiệu bất thường hãy đến cơ sở y tế gần nhất [2]."
+).split(" ")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeOllama"  # type: ignore[assignment]
+    # Keep-alive, like Ollama; streamed replies use chunked encoding
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        raw = self.rfile.read(length) if length > 0 else b"{}"
+        try:
+            return json.loads(raw.decode("utf-8"))
+        except Exception:
+            return {}
+
+    def _json(self, obj, status=HTTPStatus.OK):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):  # noqa: N802
+        if self.path == "/api/tags":
+            return self._json({"models": []})
+        self._json({"error": "not found"}, HTTPStatus.NOT_FOUND)
+
+    def do_POST(self):  # noqa: N802
+        body = self._read_json()
+        srv = self.server
+        if self.path == "/api/embed":
+            texts = body.get("input") or []
+            if isinstance(texts, str):
+                texts = [texts]
+            srv.wait(srv.embed_latency)
+            return self._json({"embeddings": [fake_vector(t, srv.dim) for t in texts]})
+        if self.path == "/api/embeddings":
+            srv.wait(srv.embed_latency)
+            return self._json({"embedding": fake_vector(body.get("prompt") or "", srv.dim)})
+        if self.path == "/api/chat":
+            return self._chat(body)
+        self._json({"error": "not found"}, HTTPStatus.NOT_FOUND)
+
+    def _chat(self, body):
+        srv = self.server
+        model = body.get("model") or "fake"
+        tokens = srv.answer_tokens()
+        srv.wait(srv.chat_latency)
+        if not body.get("stream", True):
+            srv.wait(len(tokens) * srv.token_interval)
+            return self._json({"model": model, "message": {"role": "assistant", "content": "".join(tokens)}, "done": True})
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for tok in tokens:
+            srv.wait(srv.token_interval)
+            self._chunk({"model": model, "message": {"role": "assistant", "content": tok}, "done": False})
+        self._chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeOllama(ThreadingHTTPServer):
+    """Local stand-in for an Ollama server, for benchmarks and load tests.
+
+    Serves `/api/embed` and `/api/embeddings` with deterministic vectors of
+    size `dim`, after `embed_latency` seconds per request, and `/api/chat`
+    (streamed NDJSON or not) with a canned answer of `max_tokens` tokens:
+    the first arrives after `chat_latency` seconds, the rest at
+    `tokens_per_s` (0 = instantly). Start it with `start()` (background
+    thread) and point OLLAMA_BASE_URL at `url`.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        dim: int = 64,
+        embed_latency: float = 0.0,
+        chat_latency: float = 0.0,
+        tokens_per_s: float = 0.0,
+        max_tokens: int = 64,
+    ):
+        super().__init__((host, port), _Handler)
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.token_interval = 1.0 / tokens_per_s if tokens_per_s > 0 else 0.0
+        self.max_tokens = max(1, max_tokens)
+        self._thread: Optional[threading.Thread] = None
+
+    def answer_tokens(self) -> List[str]:
+        words = [_ANSWER[i % len(_ANSWER)] for i in range(self.max_tokens)]
+        return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @staticmethod
+    def wait(seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import hashlib
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .chunking import chunk_text
+from .embeddings import Embeddings
+from .vectorstore import ChromaStore
+
+
+def row_hash(text: str, chunk_size: int, chunk_overlap: int) -> str:
+    """Content hash of a source row; chunking params are part of it so
+    re-chunking with different settings re-ingests every row."""
+    h = hashlib.sha256(f"{chunk_size}:{chunk_overlap}\n".encode("utf-8"))
+    h.update((text or "").encode("utf-8"))
+    return h.hexdigest()
+
+
+def chunk_row(
+    base_id: str, text: str, chunk_size: int, chunk_overlap: int
+) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+    """Split one source row into (ids, documents, metadatas)."""
+    digest = row_hash(text, chunk_size, chunk_overlap)
+    chunks = chunk_text(text or "", chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    ids = [f"{base_id}-{j}" for j in range(len(chunks))]
+    metas = [{"row_id": base_id, "chunk": j, "row_hash": digest} for j in range(len(chunks))]
+    return ids, chunks, metas
+
+
+@dataclass
+class RowState:
+    row_hash: Optional[str] = None
+    ids: Set[str] = field(default_factory=set)
+
+
+def load_row_index(store: ChromaStore) -> Dict[str, RowState]:
+    """Map row_id -> stored hash and chunk ids, read from chunk metadata."""
+    index: Dict[str, RowState] = {}
+    for id_, meta in store.iter_metadatas():
+        row_id = meta.get("row_id")
+        if row_id is None:
+            # Not written by `ingest`; leave it alone
+            continue
+        state = index.setdefault(str(row_id), RowState())
+        h = meta.get("row_hash") or ""
+        if state.row_hash is None:
+            state.row_hash = h
+        elif state.row_hash != h:
+            # Chunks disagree (half-written row); force a refresh
+            state.row_hash = ""
+        state.ids.add(id_)
+    return index
+
+
+Chunk = Tuple[str, str, Dict[str, Any]]
+
+
+def iter_chunks(
+    rows: Iterable[Dict[str, Any]], text_field: str, id_field: Optional[str], chunk_size: int, chunk_overlap: int
+) -> Iterator[Chunk]:
+    """Stream (id, document, metadata) for every chunk of every row."""
+    for i, row in enumerate(rows):
+        base_id = str(row[id_field]) if id_field else str(i)
+        ids, docs, metas = chunk_row(base_id, str(row[text_field] or ""), chunk_size, chunk_overlap)
+        yield from zip(ids, docs, metas)
+
+
+class IncrementalDiff:
+    """Diff source rows against the stored row index while streaming.
+
+    `chunks()` yields only the chunks of new or changed rows; rows whose
+    hash and chunk ids match are skipped. Chunks a row no longer produces
+    (it shrank) and all chunks of rows missing from the source end up in
+    `stale_ids` once the generator is exhausted.
+    """
+
+    def __init__(self, existing: Dict[str, RowState]):
+        self.existing = existing
+        self.stale_ids: List[str] = []
+        self.unchanged_rows = 0
+        self.changed_rows = 0
+        self.removed_rows = 0
+
+    def chunks(
+        self, rows: Iterable[Dict[str, Any]], text_field: str, id_field: Optional[str], chunk_size: int, chunk_overlap: int
+    ) -> Iterator[Chunk]:
+        seen: Set[str] = set()
+        for i, row in enumerate(rows):
+            base_id = str(row[id_field]) if id_field else str(i)
+            seen.add(base_id)
+            text = str(row[text_field] or "")
+            ids, docs, metas = chunk_row(base_id, text, chunk_size, chunk_overlap)
+            prev = self.existing.get(base_id)
+            if prev is None and not ids:
+                continue
+            if prev is not None and prev.row_hash == row_hash(text, chunk_size, chunk_overlap) and prev.ids == set(ids):
+                self.unchanged_rows += 1
+                continue
+            self.changed_rows += 1
+            if prev is not None:
+                self.stale_ids.extend(sorted(prev.ids - set(ids)))
+            yield from zip(ids, docs, metas)
+        for row_id, state in self.existing.items():
+            if row_id not in seen:
+                self.removed_rows += 1
+                self.stale_ids.extend(sorted(state.ids))
+
+
+_DONE = object()
+
+
+def _batched(items: Iterable, n: int) -> Iterator[List]:
+    batch: List = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _put(q: "queue.Queue", item, stop: threading.Event):
+    # Blocking put that gives up once another stage has failed
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def run_pipeline(
+    chunks: Iterable[Chunk],
+    emb: Embeddings,
+    write: Callable[[List[str], List[str], List[List[float]], List[Dict[str, Any]]], None],
+    embed_batch_size: int = 256,
+    write_batch_size: int = 1024,
+    queue_size: int = 4,
+) -> int:
+    """Stream chunks -> embedding batches -> write batches with bounded queues.
+
+    Chunking and embedding run on their own threads, so batch N+1 is being
+    embedded while batch N is written. At most `queue_size` batches wait
+    between stages, which keeps peak memory independent of corpus size.
+    Returns the number of chunks written; re-raises the first stage error.
+    """
+    to_embed: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    to_write: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def produce():
+        try:
+            for batch in _batched(chunks, embed_batch_size):
+                _put(to_embed, batch, stop)
+                if stop.is_set():
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(to_embed, _DONE, stop)
+
+    def embed():
+        try:
+            while not stop.is_set():
+                try:
+                    batch = to_embed.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if batch is _DONE:
+                    break
+                vectors = emb.embed_documents([doc for _, doc, _ in batch])
+                _put(to_write, (batch, vectors), stop)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(to_write, _DONE, stop)
+
+    threads = [threading.Thread(target=produce, daemon=True), threading.Thread(target=embed, daemon=True)]
+    for t in threads:
+        t.start()
+
+    written = 0
+    ids: List[str] = []
+    docs: List[str] = []
+    vecs: List[List[float]] = []
+    metas: List[Dict[str, Any]] = []
+
+    def flush():
+        nonlocal written, ids, docs, vecs, metas
+        if ids:
+            write(ids, docs, vecs, metas)
+            written += len(ids)
+            ids, docs, vecs, metas = [], [], [], []
+
+    try:
+        while not stop.is_set():
+            try:
+                item = to_write.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            batch, vectors = item
+            for (id_, doc, meta), vec in zip(batch, vectors):
+                ids.append(id_)
+                docs.append(doc)
+                metas.append(meta)
+                vecs.append(vec)
+            if len(ids) >= write_batch_size:
+                flush()
+        if not errors:
+            flush()
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+    return written
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+_WORD = re.compile(r"\w+")
+_D_FOLD = str.maketrans({"đ": "d", "Đ": "D"})
+
+
+def fold_accents(text: str) -> str:
+    """Strip Vietnamese diacritics (tones and vowel marks; đ -> d)."""
+    nfd = unicodedata.normalize("NFD", (text or "").translate(_D_FOLD))
+    return "".join(c for c in nfd if unicodedata.category(c) != "Mn")
+
+
+def tokenize(text: str) -> List[str]:
+    """Vietnamese-aware terms: accent-folded syllables plus syllable bigrams.
+
+    Folding lets unaccented queries ("mang thai") match accented text;
+    bigrams ("mang_thai") stand in for multi-syllable words, which
+    Vietnamese writes with spaces, and restore most of the precision lost
+    by folding.
+    """
+    syllables = _WORD.findall(fold_accents(text).lower())
+    return syllables + [f"{a}_{b}" for a, b in zip(syllables, syllables[1:])]
+
+
+class BM25Index:
+    """In-process BM25 (Okapi) inverted index over a collection's documents.
+
+    Postings are numpy arrays of (doc index, BM25 term weight), so a query
+    is a handful of scatter-adds and one `argpartition`; no network calls.
+    Built from `store.iter_documents()` and optionally persisted as JSON
+    together with the source fingerprint it was built from.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.fingerprint: Optional[Tuple] = None
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._tfs: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._lengths: List[int] = []
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, records: Iterable[Tuple[str, str, Dict[str, Any]]], fingerprint: Optional[Tuple] = None, **kw) -> "BM25Index":
+        index = cls(**kw)
+        tfs: Dict[str, Tuple[List[int], List[int]]] = {}
+        for i, (id_, doc, meta) in enumerate(records):
+            terms = tokenize(doc)
+            index.ids.append(id_)
+            index.documents.append(doc or "")
+            index.metadatas.append(meta or {})
+            index._lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                docs, counts = tfs.setdefault(term, ([], []))
+                docs.append(i)
+                counts.append(tf)
+        index._tfs = tfs
+        index.fingerprint = tuple(fingerprint) if fingerprint is not None else None
+        index._finalize()
+        return index
+
+    def _finalize(self):
+        n = len(self.ids)
+        lengths = np.asarray(self._lengths, dtype=np.float32)
+        avg = float(lengths.mean()) if n else 0.0
+        norm = self.k1 * (1.0 - self.b + self.b * lengths / avg) if avg else np.full(n, self.k1, dtype=np.float32)
+        postings = {}
+        for term, (docs, counts) in self._tfs.items():
+            idx = np.asarray(docs, dtype=np.int32)
+            tf = np.asarray(counts, dtype=np.float32)
+            idf = math.log(1.0 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            postings[term] = (idx, (idf * tf * (self.k1 + 1.0) / (tf + norm[idx])).astype(np.float32))
+        self._postings = postings
+
+    def query(self, text: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        n = len(self.ids)
+        if n == 0:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(text)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        matched = int(np.count_nonzero(scores))
+        k = min(top_k, matched)
+        if k <= 0:
+            return []
+        idx = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+        return [
+            {
+                "id": self.ids[i],
+                "document": self.documents[i],
+                "metadata": dict(self.metadatas[i] or {}),
+                "distance": None,
+                "score": float(scores[i]),
+            }
+            for i in idx.tolist()
+        ]
+
+    def save(self, path: str):
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "fingerprint": list(self.fingerprint) if self.fingerprint is not None else None,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+            "lengths": self._lengths,
+            "terms": self._tfs,
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        fp = data.get("fingerprint")
+        index.fingerprint = tuple(fp) if fp is not None else None
+        index.ids = data["ids"]
+        index.documents = data["documents"]
+        index.metadatas = data["metadatas"]
+        index._lengths = data["lengths"]
+        index._tfs = {t: (v[0], v[1]) for t, v in data["terms"].items()}
+        index._finalize()
+        return index
+
+
+class LexicalIndex:
+    """BM25 over a store, kept in step with its collection fingerprint.
+
+    At startup the index is loaded from `path` if it was built from the
+    same collection contents, otherwise built from the store and saved
+    there. Afterwards `sync` rebuilds it whenever the fingerprint changes.
+    """
+
+    def __init__(self, store, path: Optional[str] = None):
+        self.store = store
+        self.path = path or None
+        self._lock = threading.Lock()
+        fingerprint = store.fingerprint()
+        index = self._load(_content_fp(fingerprint)) if self.path else None
+        self.index = index or self._build(fingerprint)
+        self._synced = fingerprint
+
+    def _load(self, content_fp: Tuple) -> Optional[BM25Index]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            index = BM25Index.load(self.path)
+        except Exception:
+            return None
+        # Compare through JSON so tuples/lists and numbers round-trip alike
+        return index if index.fingerprint == tuple(json.loads(json.dumps(list(content_fp)))) else None
+
+    def _build(self, fingerprint: Tuple) -> BM25Index:
+        index = BM25Index.build(self.store.iter_documents(), fingerprint=_content_fp(fingerprint))
+        if self.path:
+            try:
+                index.save(self.path)
+            except OSError:
+                pass
+        return index
+
+    def sync(self, fingerprint: Optional[Tuple]):
+        if fingerprint is None or fingerprint == self._synced:
+            return
+        with self._lock:
+            if fingerprint == self._synced:
+                return
+            self.index = self._build(fingerprint)
+            self._synced = fingerprint
+
+    def query(self, text: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        return self.index.query(text, top_k=top_k)
+
+
+def _content_fp(fingerprint: Tuple) -> Tuple:
+    # The trailing local write counter means nothing to another process
+    return tuple(fingerprint[:4])
+
+
+def rrf_fuse(rankings: Sequence[List[Dict[str, Any]]], top_k: int, k: int = 60) -> List[Dict[str, Any]]:
+    """Reciprocal-rank fusion: score(d) = sum over lists of 1 / (k + rank).
+
+    A hit keeps the fields of the first list it appears in (so dense
+    distances survive) plus an `rrf` score.
+    """
+    scores: Dict[str, float] = {}
+    hits: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, 1):
+            id_ = hit["id"]
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank)
+            hits.setdefault(id_, hit)
+    order = sorted(scores, key=lambda i: -scores[i])[:top_k]
+    return [dict(hits[i], rrf=scores[i]) for i in order]
@@ -1,37 +1,51 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, TYPE_CHECKING
+import json
+from typing import AsyncIterator, Dict, Iterator, List, Optional, TYPE_CHECKING
 import requests
 
-from .config import settings
-
-try:
-    from cerebras.cloud.sdk import Cerebras  # type: ignore
-except Exception:
-    Cerebras = None  # type: ignore
+from .aio import get_async_client
+from .config import ollama_keep_alive, settings
 
 if TYPE_CHECKING:
+    from cerebras.cloud.sdk import AsyncCerebras as _AsyncCerebrasType  # type: ignore
     from cerebras.cloud.sdk import Cerebras as _CerebrasType  # type: ignore
 
 
 class OllamaChat:
-    """Minimal wrapper around Ollama /api/chat with non-streaming responses."""
+    """Minimal wrapper around Ollama /api/chat (blocking or streamed)."""
 
     def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None, timeout: int = 300):
         self.base_url = (base_url or settings.ollama_base_url).rstrip("/")
         self.model = model or settings.generation_model
         self.timeout = timeout
 
-    def generate(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> str:
-        url = f"{self.base_url}/api/chat"
+    def _payload(self, messages: List[Dict[str, str]], temperature: float, system: Optional[str], stream: bool) -> Dict:
         payload = {
             "model": self.model,
             "messages": ([] if system is None else [{"role": "system", "content": system}]) + messages,
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": temperature,
             },
         }
+        keep_alive = ollama_keep_alive()
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return payload
+
+    def preload(self):
+        """Load the model into memory without generating (empty chat request)."""
+        payload = {"model": self.model, "messages": [], "stream": False}
+        keep_alive = ollama_keep_alive()
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        resp = requests.post(f"{self.base_url}/api/chat", json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+
+    def generate(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> str:
+        url = f"{self.base_url}/api/chat"
+        payload = self._payload(messages, temperature, system, stream=False)
         resp = requests.post(url, json=payload, timeout=self.timeout)
         resp.raise_for_status()
         data = resp.json()
@@ -39,6 +53,49 @@ class OllamaChat:
         msg = data.get("message") or {}
         return (msg.get("content") or "").strip()
 
+    async def agenerate(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> str:
+        url = f"{self.base_url}/api/chat"
+        payload = self._payload(messages, temperature, system, stream=False)
+        resp = await get_async_client().post(url, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        msg = resp.json().get("message") or {}
+        return (msg.get("content") or "").strip()
+
+    async def agenerate_stream(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> AsyncIterator[str]:
+        url = f"{self.base_url}/api/chat"
+        payload = self._payload(messages, temperature, system, stream=True)
+        async with get_async_client().stream("POST", url, json=payload, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(f"Ollama error: {data['error']}")
+                piece = (data.get("message") or {}).get("content") or ""
+                if piece:
+                    yield piece
+                if data.get("done"):
+                    break
+
+    def generate_stream(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> Iterator[str]:
+        """Yield answer text pieces as Ollama produces them (NDJSON stream)."""
+        url = f"{self.base_url}/api/chat"
+        payload = self._payload(messages, temperature, system, stream=True)
+        with requests.post(url, json=payload, timeout=self.timeout, stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(f"Ollama error: {data['error']}")
+                piece = (data.get("message") or {}).get("content") or ""
+                if piece:
+                    yield piece
+                if data.get("done"):
+                    break
+
 
 class GeminiChat:
     """Gemini chat via official google-genai client, with REST fallback.
@@ -109,69 +166,194 @@ class GeminiChat:
         # Prefer SDK path if available
         if self._use_sdk and self._sdk is not None:
             try:
-                from google.genai import types  # type: ignore
                 contents = self._to_sdk_contents(messages)
                 # If no messages were provided, nothing to send
                 if not contents:
                     return ""
-                config = types.GenerateContentConfig(
-                    temperature=max(0.0, float(temperature)),
-                    # Field name uses camelCase per SDK definition
-                    systemInstruction=system if system else None,
-                )
+                config = self._sdk_config(temperature, system)
                 resp = self._sdk.models.generate_content(
                     model=self.model,
                     contents=contents,
                     config=config,
                 )
-                # SDK response has a convenient .text aggregator
-                text = getattr(resp, "text", None)
-                if isinstance(text, str) and text.strip():
-                    return text.strip()
-                # Fallback: attempt to join parts
-                try:
-                    cands = getattr(resp, "candidates", None) or []
-                    for c in cands:
-                        content = getattr(c, "content", None)
-                        parts = getattr(content, "parts", None) or []
-                        buf: List[str] = []
-                        for p in parts:
-                            t = getattr(p, "text", None)
-                            if t:
-                                buf.append(str(t).strip())
-                        if buf:
-                            return "\n".join(buf).strip()
-                except Exception:
-                    pass
-                return ""
+                return self._sdk_text(resp)
             except Exception:
                 # On any SDK error, fall back to REST path below
                 pass
 
         # REST fallback using public endpoint
         url = f"{self.base_url}/models/{self.model}:generateContent"
+        payload = self._rest_payload(messages, temperature, system)
+        resp = requests.post(url, params={"key": api_key}, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json() or {}
+        return "\n".join(self._rest_parts(data, strip=True)).strip()
+
+    async def agenerate(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> str:
+        """Async twin of `generate`: SDK `client.aio`, else REST via the shared async client."""
+        api_key = self.api_key or getattr(settings, "gemini_api_key", None)
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY not configured")
+
+        if self._use_sdk and self._sdk is not None:
+            try:
+                contents = self._to_sdk_contents(messages)
+                if not contents:
+                    return ""
+                resp = await self._sdk.aio.models.generate_content(
+                    model=self.model,
+                    contents=contents,
+                    config=self._sdk_config(temperature, system),
+                )
+                return self._sdk_text(resp)
+            except Exception:
+                pass
+
+        url = f"{self.base_url}/models/{self.model}:generateContent"
+        payload = self._rest_payload(messages, temperature, system)
+        resp = await get_async_client().post(url, params={"key": api_key}, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json() or {}
+        return "\n".join(self._rest_parts(data, strip=True)).strip()
+
+    @staticmethod
+    def _sdk_text(resp) -> str:
+        # SDK response has a convenient .text aggregator
+        text = getattr(resp, "text", None)
+        if isinstance(text, str) and text.strip():
+            return text.strip()
+        # Fallback: attempt to join parts
+        try:
+            cands = getattr(resp, "candidates", None) or []
+            for c in cands:
+                content = getattr(c, "content", None)
+                parts = getattr(content, "parts", None) or []
+                buf: List[str] = []
+                for p in parts:
+                    t = getattr(p, "text", None)
+                    if t:
+                        buf.append(str(t).strip())
+                if buf:
+                    return "\n".join(buf).strip()
+        except Exception:
+            pass
+        return ""
+
+    def generate_stream(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> Iterator[str]:
+        """Yield answer text pieces as Gemini produces them.
+
+        Uses `generate_content_stream` from the SDK, or the REST
+        `streamGenerateContent` endpoint with server-sent events. The SDK
+        path falls back to REST only if it fails before yielding anything.
+        """
+        api_key = self.api_key or getattr(settings, "gemini_api_key", None)
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY not configured")
+
+        if self._use_sdk and self._sdk is not None:
+            yielded = False
+            try:
+                contents = self._to_sdk_contents(messages)
+                if not contents:
+                    return
+                stream = self._sdk.models.generate_content_stream(
+                    model=self.model,
+                    contents=contents,
+                    config=self._sdk_config(temperature, system),
+                )
+                for chunk in stream:
+                    text = getattr(chunk, "text", None)
+                    if isinstance(text, str) and text:
+                        yielded = True
+                        yield text
+                return
+            except Exception:
+                if yielded:
+                    raise
+                # Nothing sent yet: fall back to REST streaming below
+
+        url = f"{self.base_url}/models/{self.model}:streamGenerateContent"
+        payload = self._rest_payload(messages, temperature, system)
+        with requests.post(url, params={"key": api_key, "alt": "sse"}, json=payload, timeout=self.timeout, stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:"):].strip() or "{}")
+                for text in self._rest_parts(data, strip=False):
+                    yield text
+
+    async def agenerate_stream(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> AsyncIterator[str]:
+        api_key = self.api_key or getattr(settings, "gemini_api_key", None)
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY not configured")
+
+        if self._use_sdk and self._sdk is not None:
+            yielded = False
+            try:
+                contents = self._to_sdk_contents(messages)
+                if not contents:
+                    return
+                stream = await self._sdk.aio.models.generate_content_stream(
+                    model=self.model,
+                    contents=contents,
+                    config=self._sdk_config(temperature, system),
+                )
+                async for chunk in stream:
+                    text = getattr(chunk, "text", None)
+                    if isinstance(text, str) and text:
+                        yielded = True
+                        yield text
+                return
+            except Exception:
+                if yielded:
+                    raise
+
+        url = f"{self.base_url}/models/{self.model}:streamGenerateContent"
+        payload = self._rest_payload(messages, temperature, system)
+        params = {"key": api_key, "alt": "sse"}
+        async with get_async_client().stream("POST", url, params=params, json=payload, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line or not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:"):].strip() or "{}")
+                for text in self._rest_parts(data, strip=False):
+                    yield text
+
+    def _sdk_config(self, temperature: float, system: Optional[str]):
+        from google.genai import types  # type: ignore
+        return types.GenerateContentConfig(
+            temperature=max(0.0, float(temperature)),
+            # Field name uses camelCase per SDK definition
+            systemInstruction=system if system else None,
+        )
+
+    def _rest_payload(self, messages: List[Dict[str, str]], temperature: float, system: Optional[str]) -> Dict:
         payload: Dict = {
             "contents": self._to_rest_contents(messages),
             "generationConfig": {"temperature": max(0.0, float(temperature))},
         }
         if system:
             payload["systemInstruction"] = {"parts": [{"text": system}]}
+        return payload
 
-        resp = requests.post(url, params={"key": api_key}, json=payload, timeout=self.timeout)
-        resp.raise_for_status()
-        data = resp.json() or {}
-        candidates = data.get("candidates") or []
+    @staticmethod
+    def _rest_parts(data: Dict, strip: bool) -> List[str]:
+        candidates = (data or {}).get("candidates") or []
         if not candidates:
-            return ""
+            return []
         first = candidates[0] or {}
         content = first.get("content") or {}
         parts = content.get("parts") or []
         texts = []
         for p in parts:
-            t = (p.get("text") or "").strip()
+            t = p.get("text") or ""
+            if strip:
+                t = t.strip()
             if t:
                 texts.append(t)
-        return "\n".join(texts).strip()
+        return texts
 
 
 class CerebrasChat:
@@ -182,22 +364,37 @@ class CerebrasChat:
         self.timeout = timeout
         self.api_key = (api_key or getattr(settings, "cerebras_api_key", None) or "").strip()
         self._client: Optional["_CerebrasType"] = None
+        self._async_client: Optional["_AsyncCerebrasType"] = None
 
-    def _ensure_client(self) -> "_CerebrasType":
-        if Cerebras is None:
+    @staticmethod
+    def _sdk():
+        # Imported on first use so other backends never load the SDK
+        try:
+            from cerebras.cloud import sdk  # type: ignore
+        except Exception as e:
             raise RuntimeError(
                 "cerebras_cloud_sdk is not installed. Install with `pip install cerebras_cloud_sdk`."
-            )
-        if not self.api_key:
-            raise RuntimeError("CEREBRAS_API_KEY not configured")
+            ) from e
+        return sdk
+
+    def _ensure_client(self) -> "_CerebrasType":
         if self._client is None:
-            self._client = Cerebras(api_key=self.api_key)
+            sdk = self._sdk()
+            if not self.api_key:
+                raise RuntimeError("CEREBRAS_API_KEY not configured")
+            self._client = sdk.Cerebras(api_key=self.api_key)
         return self._client
 
-    def generate(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> str:
-        # Normalize temperature to valid range
-        temperature = max(0.0, float(temperature))
+    def _ensure_async_client(self) -> "_AsyncCerebrasType":
+        if self._async_client is None:
+            sdk = self._sdk()
+            if not self.api_key:
+                raise RuntimeError("CEREBRAS_API_KEY not configured")
+            self._async_client = sdk.AsyncCerebras(api_key=self.api_key)
+        return self._async_client
 
+    @staticmethod
+    def _conversation(messages: List[Dict[str, str]], system: Optional[str]) -> List[Dict[str, str]]:
         conversation: List[Dict[str, str]] = []
         if system:
             conversation.append({"role": "system", "content": system})
@@ -207,6 +404,34 @@ class CerebrasChat:
                 continue
             role = msg.get("role") or "user"
             conversation.append({"role": role, "content": content})
+        return conversation
+
+    def generate_stream(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> Iterator[str]:
+        """Yield answer text pieces from a streamed chat completion."""
+        conversation = self._conversation(messages, system)
+        if not conversation:
+            return
+        client = self._ensure_client()
+        stream = client.chat.completions.create(
+            messages=conversation,
+            model=self.model,
+            temperature=max(0.0, float(temperature)),
+            stream=True,
+        )
+        for chunk in stream:
+            choices = getattr(chunk, "choices", None) or []
+            if not choices:
+                continue
+            delta = getattr(choices[0], "delta", None)
+            content = getattr(delta, "content", None)
+            if isinstance(content, str) and content:
+                yield content
+
+    def generate(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> str:
+        # Normalize temperature to valid range
+        temperature = max(0.0, float(temperature))
+
+        conversation = self._conversation(messages, system)
         if not conversation:
             return ""
 
@@ -216,6 +441,42 @@ class CerebrasChat:
             model=self.model,
             temperature=temperature,
         )
+        return self._response_text(response)
+
+    async def agenerate(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> str:
+        conversation = self._conversation(messages, system)
+        if not conversation:
+            return ""
+        client = self._ensure_async_client()
+        response = await client.chat.completions.create(
+            messages=conversation,
+            model=self.model,
+            temperature=max(0.0, float(temperature)),
+        )
+        return self._response_text(response)
+
+    async def agenerate_stream(self, messages: List[Dict[str, str]], temperature: float = 0.2, system: Optional[str] = None) -> AsyncIterator[str]:
+        conversation = self._conversation(messages, system)
+        if not conversation:
+            return
+        client = self._ensure_async_client()
+        stream = await client.chat.completions.create(
+            messages=conversation,
+            model=self.model,
+            temperature=max(0.0, float(temperature)),
+            stream=True,
+        )
+        async for chunk in stream:
+            choices = getattr(chunk, "choices", None) or []
+            if not choices:
+                continue
+            delta = getattr(choices[0], "delta", None)
+            content = getattr(delta, "content", None)
+            if isinstance(content, str) and content:
+                yield content
+
+    @staticmethod
+    def _response_text(response) -> str:
         try:
             choice = response.choices[0]  # type: ignore[index]
             message = getattr(choice, "message", None)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+DEFAULT_QUESTIONS = [
+    "Mẹ bầu nên bổ sung sắt khi nào?",
+    "Ốm nghén kéo dài bao lâu?",
+    "Khi mang thai có nên tiêm phòng cúm không?",
+    "Dấu hiệu chuyển dạ sớm là gì?",
+    "Mẹ bầu tăng bao nhiêu cân là hợp lý?",
+    "Sau sinh bao lâu thì nên cho con bú?",
+]
+
+
+@dataclass
+class Sample:
+    ok: bool
+    status: int
+    latency: float
+    # Seconds until the first `token` SSE event (streaming runs only)
+    ttft: Optional[float] = None
+    error: str = ""
+
+
+class _Client:
+    """One keep-alive connection per worker; reconnects after any failure."""
+
+    def __init__(self, url: str, timeout: float):
+        u = urlparse(url)
+        self.https = u.scheme == "https"
+        self.host = u.hostname or "localhost"
+        self.port = u.port or (443 if self.https else 80)
+        self.timeout = timeout
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = cls(self.host, self.port, timeout=self.timeout)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def post(self, path: str, body: Dict[str, Any], stream: bool, t0: float) -> Sample:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        try:
+            conn = self._connect()
+            conn.request("POST", path, body=data, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            ttft = None
+            error = "" if 200 <= resp.status < 300 else f"HTTP {resp.status}"
+            if stream and not error:
+                while True:
+                    line = resp.readline()
+                    if not line:
+                        break
+                    if ttft is None and line.startswith(b"event: token"):
+                        ttft = time.perf_counter() - t0
+                    elif line.startswith(b"event: error"):
+                        error = "SSE error"
+            else:
+                resp.read()
+            if resp.getheader("Connection", "").lower() == "close":
+                self.close()
+            return Sample(not error, resp.status, time.perf_counter() - t0, ttft, error)
+        except Exception as e:
+            self.close()
+            return Sample(False, 0, time.perf_counter() - t0, None, type(e).__name__)
+
+
+def run_load(
+    url: str,
+    questions: Optional[List[str]] = None,
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    duration: float = 30.0,
+    max_requests: Optional[int] = None,
+    stream: bool = False,
+    extra: Optional[Dict[str, Any]] = None,
+    timeout: float = 120.0,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Drive a chat endpoint and summarize what it sustained.
+
+    Without `rate` this is a closed loop: `concurrency` users each send the
+    next request as soon as the previous one returns. With `rate`, requests
+    arrive as a Poisson process of `rate`/s served by up to `concurrency`
+    workers, and latency is measured from the scheduled arrival, so time
+    spent queued behind a saturated server counts (no coordinated omission).
+    Stops after `duration` seconds or `max_requests` requests.
+    """
+    u = urlparse(url)
+    path = u.path or "/api/chat"
+    questions = questions or DEFAULT_QUESTIONS
+    rng = random.Random(seed)
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+    budget = [max_requests]
+
+    def take() -> bool:
+        with lock:
+            if budget[0] is not None:
+                if budget[0] <= 0:
+                    return False
+                budget[0] -= 1
+        return deadline is None or time.perf_counter() < deadline
+
+    def body() -> Dict[str, Any]:
+        with lock:
+            q = rng.choice(questions)
+        return dict(extra or {}, message=q)
+
+    def record(s: Sample):
+        with lock:
+            samples.append(s)
+
+    arrivals: "queue.Queue[Optional[float]]" = queue.Queue()
+
+    def closed_worker():
+        client = _Client(url, timeout)
+        try:
+            while take():
+                record(client.post(path, body(), stream, time.perf_counter()))
+        finally:
+            client.close()
+
+    def open_worker():
+        client = _Client(url, timeout)
+        try:
+            while True:
+                t0 = arrivals.get()
+                if t0 is None:
+                    return
+                record(client.post(path, body(), stream, t0))
+        finally:
+            client.close()
+
+    workers = [
+        threading.Thread(target=closed_worker if not rate else open_worker, daemon=True)
+        for _ in range(max(1, concurrency))
+    ]
+    for w in workers:
+        w.start()
+    if rate:
+        next_at = time.perf_counter()
+        while take():
+            next_at += rng.expovariate(rate)
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            arrivals.put(next_at)
+        for _ in workers:
+            arrivals.put(None)
+    for w in workers:
+        w.join()
+    return summarize(samples, time.perf_counter() - started)
+
+
+def _pct(xs: List[float], p: float) -> Optional[float]:
+    if not xs:
+        return None
+    return round(xs[min(len(xs) - 1, int(p * len(xs)))] * 1000.0, 1)
+
+
+def summarize(samples: List[Sample], wall: float) -> Dict[str, Any]:
+    lat = sorted(s.latency for s in samples if s.ok)
+    ttft = sorted(s.ttft for s in samples if s.ok and s.ttft is not None)
+    errors = Counter(s.error for s in samples if not s.ok)
+    out: Dict[str, Any] = {
+        "requests": len(samples),
+        "ok": len(lat),
+        "errors": len(samples) - len(lat),
+        "error_rate": round((len(samples) - len(lat)) / max(len(samples), 1), 4),
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(len(lat) / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": {p: _pct(lat, q) for p, q in (("p50", 0.5), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99))},
+        "status": dict(Counter(s.status for s in samples)),
+    }
+    if lat:
+        out["latency_ms"]["max"] = round(lat[-1] * 1000.0, 1)
+    if ttft:
+        out["ttft_ms"] = {"p50": _pct(ttft, 0.5), "p95": _pct(ttft, 0.95), "p99": _pct(ttft, 0.99)}
+    if errors:
+        out["error_kinds"] = dict(errors)
+    return out
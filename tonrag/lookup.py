@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import csv
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .cache import normalize_query
+
+
+def normalize_question(text: str) -> str:
+    """Lookup key: `normalize_query` minus trailing punctuation ("...?" == "...")."""
+    return normalize_query(text).rstrip(" ?.!…")
+
+
+def parse_qa_record(doc: str) -> Dict[str, str]:
+    """Split a `question: … answer: … reference: …` document into its fields."""
+    q = a = r = ""
+    for line in (doc or "").splitlines():
+        s = line.strip()
+        if not s:
+            continue
+        low = s.lower()
+        if low.startswith("question:"):
+            q = s.split(":", 1)[1].strip()
+        elif low.startswith("answer:"):
+            a = s.split(":", 1)[1].strip()
+        elif low.startswith("reference:"):
+            r = s.split(":", 1)[1].strip()
+    return {"question": q, "answer": a, "reference": r}
+
+
+@dataclass
+class QAEntry:
+    id: str
+    question: str
+    answer: str
+    reference: str
+
+    def document(self) -> str:
+        return f"question: {self.question}\nanswer: {self.answer}\nreference: {self.reference}"
+
+
+class QuestionIndex:
+    """Hash index from normalized question text to its curated answer.
+
+    Built from the dataset CSV (the `Manually review` answer wins over
+    `output`, as in scripts/build_vector_db.py) or from the
+    `question:/answer:/reference:` documents stored in the collection.
+    The first row wins when a question appears twice.
+    """
+
+    def __init__(self, entries: Iterable[QAEntry] = ()):
+        self._entries: Dict[str, QAEntry] = {}
+        self.duplicates = 0
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: QAEntry):
+        key = normalize_question(entry.question)
+        if not key or not entry.answer:
+            return
+        if key in self._entries:
+            self.duplicates += 1
+            return
+        self._entries[key] = entry
+
+    def get(self, question: str) -> Optional[QAEntry]:
+        return self._entries.get(normalize_question(question))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "QuestionIndex":
+        index = cls()
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                manual = (row.get("Manually review") or "").strip()
+                index.add(QAEntry(
+                    id=str(row.get("no") or i),
+                    question=(row.get("input") or "").strip(),
+                    answer=manual or (row.get("output") or "").strip(),
+                    reference=(row.get("Reference") or "").strip(),
+                ))
+        return index
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, str, Dict[str, Any]]]) -> "QuestionIndex":
+        index = cls()
+        for id_, doc, _ in records:
+            fields = parse_qa_record(doc)
+            index.add(QAEntry(id=id_, question=fields["question"], answer=fields["answer"], reference=fields["reference"]))
+        return index
+
+
+class QuestionLookup:
+    """`QuestionIndex` from a CSV path, or from the store (source 'store').
+
+    A store-backed index is rebuilt when the collection fingerprint
+    changes, like the BM25 index.
+    """
+
+    def __init__(self, source: str, store=None):
+        self.source = source
+        self.store = store
+        self._lock = threading.Lock()
+        self._synced: Optional[Tuple] = None
+        if source == "store":
+            self._synced = store.fingerprint()
+            self.index = QuestionIndex.from_records(store.iter_documents())
+        else:
+            self.index = QuestionIndex.from_csv(source)
+
+    def sync(self, fingerprint: Optional[Tuple]):
+        if self.source != "store" or fingerprint is None or fingerprint == self._synced:
+            return
+        with self._lock:
+            if fingerprint == self._synced:
+                return
+            self.index = QuestionIndex.from_records(self.store.iter_documents())
+            self._synced = fingerprint
+
+    def get(self, question: str) -> Optional[QAEntry]:
+        return self.index.get(question)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Seconds; spans a cached embedding lookup up to a slow cloud generation
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):  # noqa: A002
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):  # noqa: A002
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, +Inf included as the last slot; sum)
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = _labels(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][i] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                running = 0
+                for le, n in zip(self.buckets, counts):
+                    running += n
+                    lines.append(f"{self.name}_bucket{_fmt(key, ('le', f'{le:g}'))} {running}")
+                running += counts[-1]
+                lines.append(f"{self.name}_bucket{_fmt(key, ('le', '+Inf'))} {running}")
+                lines.append(f"{self.name}_sum{_fmt(key)} {total[0]:.6f}")
+                lines.append(f"{self.name}_count{_fmt(key)} {running}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, help: str) -> Counter:  # noqa: A002
+        m = Counter(name, help)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:  # noqa: A002
+        m = Histogram(name, help, buckets)
+        self._metrics.append(m)
+        return m
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "tonrag_stage_seconds", "Time spent in one pipeline stage (embed, vector_search, lexical_search, context_assembly, prompt_build, generation, fallback, warmup_*)."
+)
+FALLBACKS = REGISTRY.counter(
+    "tonrag_fallback_total", "Answers served by the extractive fallback because generation failed or returned nothing."
+)
+ANSWERS = REGISTRY.counter(
+    "tonrag_answers_total", "Answers by source: llm, answer_cache, lookup or fallback."
+)
+REQUEST_SECONDS = REGISTRY.histogram("tonrag_request_seconds", "End-to-end chat request latency.")
+
+# Per-request stage totals, filled while `collect_timings()` is active.
+# asyncio.to_thread copies the context, so worker threads add to the same dict.
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("tonrag_timings", default=None)
+
+
+@contextmanager
+def stage(name: str, backend: str = "") -> Iterator[None]:
+    """Time a block into `tonrag_stage_seconds{stage, backend}` and the current request's timings."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        STAGE_SECONDS.observe(elapsed, stage=name, backend=backend)
+        current = _timings.get()
+        if current is not None:
+            current[name] = current.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """Collect stage durations (seconds) of the calls made inside the block."""
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def render() -> str:
+    return REGISTRY.render()
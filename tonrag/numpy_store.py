@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .vectorstore import DEFAULT_INCLUDE, ChromaStore
+
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+class _Index(NamedTuple):
+    ids: List[str]
+    documents: List[str]
+    metadatas: List[Dict[str, Any]]
+    matrix: np.ndarray
+    space: str
+
+
+_EMPTY = _Index([], [], [], np.zeros((0, 0), dtype=np.float32), "l2")
+
+
+class NumpyStore:
+    """Exact in-memory search over a Chroma collection.
+
+    All ids, documents, metadatas and embeddings are read once into a
+    row-normalized float32 matrix; a query is one matrix product plus
+    `argpartition`, which for a corpus of a few thousand chunks is much
+    cheaper than Chroma's per-query overhead. Same `query`/`query_text`
+    contract as `ChromaStore`; read-only.
+
+    With `snapshot_path` set, the matrix is saved as `<path>` (.npy) plus
+    `<path>.json` (ids, documents, metadatas, source fingerprint) and
+    reused on the next start while the collection is unchanged. The data
+    is reloaded when the source collection's fingerprint changes.
+
+    Distances follow the collection's space on unit vectors: `cosine` and
+    `ip` give 1 - cos, `l2` gives 2 - 2 cos (squared L2), so values match
+    Chroma's when the stored embeddings are normalized.
+    """
+
+    def __init__(self, source: Optional[ChromaStore] = None, snapshot_path: Optional[str] = None):
+        if source is None and not snapshot_path:
+            source = ChromaStore(create_if_missing=False)
+        self.source = source
+        self.snapshot_path = snapshot_path or None
+        self.name = source.name if source is not None else os.path.basename(snapshot_path or "")
+        self._lock = threading.Lock()
+        self._source_fp: Optional[Tuple] = None
+        # Replaced as a whole on reload so concurrent queries see one consistent index
+        self.index = _EMPTY
+        # (index, id -> row) built on first get_embeddings() per loaded index
+        self._rows: Optional[Tuple[_Index, Dict[str, int]]] = None
+        self.load(force=True)
+
+    # Loading
+
+    def _content_fp(self) -> Optional[Tuple]:
+        # Drop the per-process write counter; it means nothing across restarts
+        return self.source.fingerprint()[:4] if self.source is not None else None
+
+    def load(self, force: bool = False):
+        with self._lock:
+            fp = self._content_fp()
+            if not force and fp == self._source_fp:
+                # Another thread already reloaded
+                return
+            index = self._load_snapshot(fp) if self.snapshot_path else None
+            self.index = index or self._load_source()
+            self._source_fp = fp
+            if index is None and self.snapshot_path:
+                self.save_snapshot(self.snapshot_path, fp)
+
+    def _load_source(self) -> _Index:
+        if self.source is None:
+            raise RuntimeError(f"No snapshot at '{self.snapshot_path}' and no Chroma collection to load from")
+        coll = self.source.collection
+        ids: List[str] = []
+        docs: List[str] = []
+        metas: List[Dict[str, Any]] = []
+        blocks: List[np.ndarray] = []
+        offset, batch = 0, 1000
+        while True:
+            res = coll.get(include=["embeddings", "documents", "metadatas"], limit=batch, offset=offset)
+            page = res.get("ids") or []
+            if page:
+                ids.extend(page)
+                docs.extend(d or "" for d in (res.get("documents") or [""] * len(page)))
+                metas.extend(m or {} for m in (res.get("metadatas") or [{}] * len(page)))
+                blocks.append(np.asarray(res.get("embeddings"), dtype=np.float32))
+            if len(page) < batch:
+                break
+            offset += batch
+        matrix = _normalize(np.vstack(blocks)) if blocks else _EMPTY.matrix
+        config = getattr(coll, "configuration", None) or {}
+        hnsw = config.get("hnsw") if isinstance(config, dict) else None
+        space = ((hnsw or {}).get("space") or (coll.metadata or {}).get("hnsw:space") or "l2").lower()
+        return _Index(ids, docs, metas, matrix, space)
+
+    def _load_snapshot(self, fp: Optional[Tuple]) -> Optional[_Index]:
+        meta_path = self.snapshot_path + ".json"
+        if not (os.path.exists(self.snapshot_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if fp is not None and meta.get("fingerprint") != list(fp):
+            # Collection changed since the snapshot was taken
+            return None
+        matrix = np.load(self.snapshot_path, allow_pickle=False)
+        return _Index(meta["ids"], meta["documents"], meta["metadatas"], matrix, meta.get("space", "l2"))
+
+    def save_snapshot(self, path: str, fingerprint: Optional[Tuple] = None):
+        """Write the normalized matrix to `path` and the rest to `path`.json."""
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        # np.save appends .npy to bare names; write through a handle to keep `path` exact
+        index = self.index
+        with open(path, "wb") as f:
+            np.save(f, index.matrix, allow_pickle=False)
+        meta = {
+            "fingerprint": list(fingerprint) if fingerprint is not None else None,
+            "space": index.space,
+            "ids": index.ids,
+            "documents": index.documents,
+            "metadatas": index.metadatas,
+        }
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    def fingerprint(self, max_age: float = 0.0) -> Tuple:
+        """Source fingerprint; reloads the matrix first if the collection changed."""
+        if self.source is None:
+            return ("numpy", self.snapshot_path, len(self.index.ids))
+        fp = self.source.fingerprint(max_age)
+        if fp[:4] != self._source_fp:
+            self.load()
+        return fp
+
+    def count(self) -> int:
+        return len(self.index.ids)
+
+    def iter_documents(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        index = self.index
+        return iter(zip(index.ids, index.documents, index.metadatas))
+
+    # Queries
+
+    @staticmethod
+    def _top_k(index: _Index, sims: np.ndarray, top_k: int, include: Sequence[str]) -> List[Dict[str, Any]]:
+        k = min(top_k, sims.shape[0])
+        if k <= 0:
+            return []
+        idx = np.argpartition(-sims, k - 1)[:k] if k < sims.shape[0] else np.arange(sims.shape[0])
+        idx = idx[np.argsort(-sims[idx], kind="stable")]
+        dists = (2.0 - 2.0 * sims[idx] if index.space == "l2" else 1.0 - sims[idx]).tolist()
+        out = []
+        for n, i in enumerate(idx.tolist()):
+            hit: Dict[str, Any] = {"id": index.ids[i]}
+            if "documents" in include:
+                hit["document"] = index.documents[i]
+            if "metadatas" in include:
+                hit["metadata"] = dict(index.metadatas[i] or {})
+            if "distances" in include:
+                hit["distance"] = float(dists[n])
+            if "embeddings" in include:
+                # Stored rows are normalized copies of the original vectors
+                hit["embedding"] = index.matrix[i].tolist()
+            out.append(hit)
+        return out
+
+    def query_many(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int = 5, include: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Top-k hits for each query with a single matrix product."""
+        if not len(query_embeddings):
+            return []
+        include = DEFAULT_INCLUDE if include is None else include
+        index = self.index
+        if index.matrix.shape[0] == 0:
+            return [[] for _ in query_embeddings]
+        q = _normalize(np.asarray(query_embeddings, dtype=np.float32))
+        sims = q @ index.matrix.T
+        return [self._top_k(index, row, top_k, include) for row in sims]
+
+    def query(self, query_embedding: List[float], top_k: int = 5):
+        return self.query_many([query_embedding], top_k=top_k)[0]
+
+    def query_text_many(
+        self, query_texts: List[str], top_k: int = 5, include: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        # Embed with the collection's own embedding function, like Chroma's query_texts
+        ef = getattr(self.source.collection, "_embedding_function", None) if self.source is not None else None
+        if ef is None:
+            raise RuntimeError("NumpyStore.query_text needs the collection's embedding function")
+        if not query_texts:
+            return []
+        return self.query_many([list(v) for v in ef(list(query_texts))], top_k=top_k, include=include)
+
+    def query_text(self, query_text: str, top_k: int = 5):
+        return self.query_text_many([query_text], top_k=top_k)[0]
+
+    def get_embeddings(self, ids: Sequence[str]) -> List[Optional[List[float]]]:
+        """Stored (normalized) embeddings of `ids`, None for unknown ids."""
+        index = self.index
+        rows = self._rows
+        if rows is None or rows[0] is not index:
+            rows = self._rows = (index, {id_: i for i, id_ in enumerate(index.ids)})
+        out: List[Optional[List[float]]] = []
+        for id_ in ids:
+            i = rows[1].get(id_)
+            out.append(index.matrix[i].tolist() if i is not None else None)
+        return out
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+# Leaf frames from these modules mean the thread is parked, not working
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+
+
+def _collapse(frame, thread_name: str) -> Optional[str]:
+    if frame.f_code.co_filename.endswith(_IDLE_MODULES):
+        return None
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    parts.append(thread_name)
+    return ";".join(reversed(parts))
+
+
+class StackSampler:
+    """Samples every thread's stack each `interval` seconds into collapsed-stack counts."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tonrag-profiler", daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _collapse(frame, names.get(ident, str(ident)))
+                if stack is not None:
+                    self.stacks[stack] += 1
+            self.samples += 1
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+@dataclass
+class Profile:
+    id: int
+    label: str
+    started_at: float
+    duration: float
+    samples: int
+    collapsed: str
+    pstats: bytes = field(repr=False)
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000.0, 2),
+            "samples": self.samples,
+        }
+
+    def top(self, limit: int = 30) -> str:
+        """Human-readable cumulative-time table from the pstats data."""
+        with tempfile.NamedTemporaryFile(suffix=".pstats", delete=False) as f:
+            f.write(self.pstats)
+        try:
+            out = io.StringIO()
+            pstats.Stats(f.name, stream=out).sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+        finally:
+            os.unlink(f.name)
+
+
+class _Session:
+    def __init__(self, label: str, interval: float):
+        self.label = label
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.sampler = StackSampler(interval).start()
+        self.cprofile = cProfile.Profile()
+        self.cprofile.enable()
+
+
+class RequestProfiler:
+    """Profiles selected requests into a bounded ring buffer.
+
+    A request is profiled when `every_n` > 0 and it is the N-th one seen,
+    or when `forced` (e.g. a debug header). Only one request is profiled at
+    a time: cProfile hooks one thread and on an event loop it also sees the
+    requests interleaved with the profiled one, so overlapping sessions
+    would only blur each other. Each profile keeps cProfile stats of the
+    starting thread (pstats) and sampled stacks of all threads (collapsed,
+    for flame graphs).
+    """
+
+    def __init__(self, every_n: int = 0, buffer_size: int = 20, interval: float = 0.005):
+        self.every_n = max(0, every_n)
+        self.interval = interval
+        self.profiles: Deque[Profile] = deque(maxlen=max(1, buffer_size))
+        self._counter = itertools.count(1)
+        self._ids = itertools.count(1)
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+
+    def start(self, label: str, forced: bool = False) -> Optional[_Session]:
+        """A session if this request should be profiled, else None."""
+        sampled = self.every_n > 0 and next(self._counter) % self.every_n == 0
+        if not (forced or sampled):
+            return None
+        if not self._active.acquire(blocking=False):
+            return None
+        try:
+            return _Session(label, self.interval)
+        except Exception:
+            # e.g. another profiler already holds the interpreter hook
+            self._active.release()
+            return None
+
+    def finish(self, session: Optional[_Session]) -> Optional[Profile]:
+        if session is None:
+            return None
+        try:
+            session.cprofile.disable()
+            stacks = session.sampler.stop()
+            duration = time.perf_counter() - session.t0
+            with tempfile.NamedTemporaryFile(suffix=".pstats", delete=False) as f:
+                path = f.name
+            try:
+                session.cprofile.dump_stats(path)
+                with open(path, "rb") as f:
+                    data = f.read()
+            finally:
+                os.unlink(path)
+        finally:
+            self._active.release()
+        collapsed = "\n".join(f"{stack} {n}" for stack, n in stacks.most_common())
+        profile = Profile(
+            id=next(self._ids),
+            label=session.label,
+            started_at=session.started_at,
+            duration=duration,
+            samples=session.sampler.samples,
+            collapsed=collapsed + ("\n" if collapsed else ""),
+            pstats=data,
+        )
+        with self._lock:
+            self.profiles.append(profile)
+        return profile
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [p.summary() for p in reversed(self.profiles)]
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        with self._lock:
+            for p in self.profiles:
+                if p.id == profile_id:
+                    return p
+        return None
@@ -1,11 +1,21 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
+from .cache import RetrievalCache, SemanticAnswerCache, embedding_key, normalize_query
 from .config import settings
-from .embeddings import get_default_embeddings
-from .vectorstore import ChromaStore
+from .context import AssembledContext, assemble_context, cosine_relevance, mmr_order
+from .embeddings import Embeddings, get_default_embeddings
+from .lexical import LexicalIndex, rrf_fuse
+from .lookup import QAEntry, QuestionLookup, normalize_question, parse_qa_record
+from .vectorstore import DEFAULT_INCLUDE, ChromaStore, get_default_store, resolve_persist_dir
 from .llm import get_default_chat
+from .metrics import ANSWERS, FALLBACKS, stage
 
 
 SYSTEM_PROMPT = (
@@ -38,6 +48,36 @@ def build_prompt(question: str, contexts: List[str]) -> List[Dict[str, str]]:
     return [{"role": "user", "content": user}]
 
 
+_dense_pool: Optional[ThreadPoolExecutor] = None
+_dense_pool_lock = threading.Lock()
+
+
+def _get_dense_pool() -> ThreadPoolExecutor:
+    # Hybrid retrieval runs the dense half here so it can be abandoned on timeout
+    global _dense_pool
+    with _dense_pool_lock:
+        if _dense_pool is None:
+            _dense_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dense-retrieve")
+        return _dense_pool
+
+
+def default_lexical_index_path() -> str:
+    return settings.lexical_index_path or os.path.join(resolve_persist_dir(), f"{settings.collection_name}.bm25.json")
+
+
+def _project(hits: List[Dict], include: Optional[List[str]]) -> List[Dict]:
+    # Trim lexical hits to the fields a batched caller asked for
+    if include is None:
+        return hits
+    keep = {"id", "score", "rrf"} | {name[:-1] for name in include}
+    return [{k: v for k, v in h.items() if k in keep} for h in hits]
+
+
+def _copy_hits(hits: List[Dict]) -> List[Dict]:
+    # Hand out copies so callers can't mutate cached entries
+    return [dict(h, metadata=dict(h["metadata"] or {})) if "metadata" in h else dict(h) for h in hits]
+
+
 class RAGPipeline:
     def __init__(
         self,
@@ -45,56 +85,419 @@ class RAGPipeline:
         llm: Optional[str] = None,
         api_key: Optional[str] = None,
         gemini_api_key: Optional[str] = None,
+        retrieval_cache: Optional[RetrievalCache] = None,
+        store: Optional[ChromaStore] = None,
+        emb: Optional[Embeddings] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        lexical: Optional[LexicalIndex] = None,
+        lookup: Optional[QuestionLookup] = None,
     ):
-        self.emb = get_default_embeddings()
-        self.store = ChromaStore(create_if_missing=False)
+        # `store`/`emb` let several pipelines share one Chroma client and embedder
+        self.emb = emb or get_default_embeddings()
+        self.store = store or get_default_store(create_if_missing=False)
         # Accept a generic API key override (Gemini legacy alias kept for compatibility)
         key_override = api_key or gemini_api_key
         self.chat = get_default_chat(llm, api_key=key_override)
         self.top_k = top_k or settings.top_k
+        if retrieval_cache is None and settings.retrieval_cache_size > 0:
+            retrieval_cache = RetrievalCache(
+                max_size=settings.retrieval_cache_size,
+                ttl=settings.retrieval_cache_ttl,
+            )
+        self.cache = retrieval_cache
+        if answer_cache is None and settings.answer_cache_size > 0:
+            answer_cache = SemanticAnswerCache(
+                max_entries=settings.answer_cache_size,
+                ttl=settings.answer_cache_ttl,
+                threshold=settings.answer_cache_threshold,
+            )
+        self.answer_cache = answer_cache
+        # Cached answers are only reused for the same backend and model
+        self.backend_id = f"{type(self.chat).__name__}:{getattr(self.chat, 'model', '')}"
+        # Label of this pipeline's metrics: 'ollama', 'gemini' or 'cerebras'
+        self.backend = type(self.chat).__name__.replace("Chat", "").lower()
+        # 'dense' (embeddings), 'lexical' (BM25, no network) or 'hybrid' (both, fused)
+        self.mode = (settings.retrieval_mode or "dense").lower()
+        if lexical is None and self.mode in ("lexical", "hybrid"):
+            lexical = LexicalIndex(self.store, path=default_lexical_index_path())
+        self.lexical = lexical
+        # Verbatim dataset questions are answered from this index, skipping the LLM
+        if lookup is None and settings.question_lookup:
+            lookup = QuestionLookup(settings.question_lookup, store=self.store)
+        self.lookup = lookup
+
+    def _refresh(self):
+        """Check the collection fingerprint; drop caches and rebuild BM25 if it changed."""
+        if self.cache is None and self.answer_cache is None and self.lexical is None and self.lookup is None:
+            return
+        fingerprint = self.store.fingerprint(max_age=settings.retrieval_cache_check_interval)
+        if self.cache is not None:
+            self.cache.sync(fingerprint)
+        if self.answer_cache is not None:
+            self.answer_cache.sync(fingerprint)
+        if self.lexical is not None:
+            self.lexical.sync(fingerprint)
+        if self.lookup is not None:
+            self.lookup.sync(fingerprint)
+
+    def _embed_query(self, query: str) -> List[float]:
+        if self.cache is None:
+            with stage("embed"):
+                return self.emb.embed_query(query)
+        key = normalize_query(query)
+        q_emb = self.cache.embeddings.get(key)
+        if q_emb is None:
+            with stage("embed"):
+                q_emb = self.emb.embed_query(query)
+            self.cache.embeddings.put(key, q_emb)
+        return q_emb
+
+    def _cached_hits(self, key, search) -> List[Dict]:
+        if self.cache is None:
+            with stage("vector_search"):
+                return search()
+        hits = self.cache.hits.get(key)
+        if hits is None:
+            with stage("vector_search"):
+                hits = search()
+            self.cache.hits.put(key, hits)
+        return _copy_hits(hits)
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embeddings for all queries; cache misses are embedded in one batch call."""
+        keys = [normalize_query(q) for q in queries]
+        out = [self.cache.embeddings.get(key) if self.cache is not None else None for key in keys]
+        todo: Dict[str, str] = {}
+        for key, q, vec in zip(keys, queries, out):
+            if vec is None:
+                todo.setdefault(key, q)
+        if todo:
+            with stage("embed"):
+                vectors = dict(zip(todo.keys(), self.emb.embed_documents(list(todo.values()))))
+            if self.cache is not None:
+                for key, vec in vectors.items():
+                    self.cache.embeddings.put(key, vec)
+            out = [vec if vec is not None else vectors[key] for key, vec in zip(keys, out)]
+        return out  # type: ignore[return-value]
+
+    def _cached_hits_many(self, keys: List, search, include: Optional[List[str]]) -> List[List[Dict]]:
+        """Per-query hits from the cache; misses are fetched by one `search(indices)` call."""
+        if include is not None and list(include) != DEFAULT_INCLUDE:
+            # Other projections are cached apart from what `retrieve` stores
+            keys = [key + (tuple(include),) for key in keys]
+        results: List[Optional[List[Dict]]] = [
+            self.cache.hits.get(key) if self.cache is not None else None for key in keys
+        ]
+        first: Dict = {}
+        for i, (key, hits) in enumerate(zip(keys, results)):
+            if hits is None:
+                first.setdefault(key, i)
+        if first:
+            with stage("vector_search"):
+                fetched = dict(zip(first.keys(), search(list(first.values()))))
+            if self.cache is not None:
+                for key, hits in fetched.items():
+                    self.cache.hits.put(key, hits)
+            results = [hits if hits is not None else fetched[key] for key, hits in zip(keys, results)]
+        return [_copy_hits(hits) for hits in results]  # type: ignore[arg-type]
+
+    async def _aembed_query(self, query: str) -> List[float]:
+        if self.cache is None:
+            with stage("embed"):
+                return await self.emb.aembed_query(query)
+        key = normalize_query(query)
+        q_emb = self.cache.embeddings.get(key)
+        if q_emb is None:
+            with stage("embed"):
+                q_emb = await self.emb.aembed_query(query)
+            self.cache.embeddings.put(key, q_emb)
+        return q_emb
+
+    def _lexical_query(self, query: str, top_k: int) -> List[Dict]:
+        with stage("lexical_search"):
+            return self.lexical.query(query, top_k=top_k)
+
+    def _search_vector(self, q_emb: List[float], k: int) -> List[Dict]:
+        return self._cached_hits((embedding_key(q_emb), k), lambda: self.store.query(q_emb, top_k=k))
+
+    def _search_embedding(self, query: str, k: int) -> List[Dict]:
+        return self._search_vector(self._embed_query(query), k)
+
+    def _search_text(self, query: str, k: int) -> List[Dict]:
+        return self._cached_hits(("text", normalize_query(query), k), lambda: self.store.query_text(query, top_k=k))
+
+    def _retrieve_dense(self, query: str, k: int) -> List[Dict]:
+        mode = (settings.chroma_query_mode or "auto").lower()
+        if mode in ("text", "auto"):
+            try:
+                return self._search_text(query, k)
+            except Exception:
+                # Fall back to embeddings if text mode isn't supported
+                pass
+        # 'embed' mode, auto fallback, and default
+        return self._search_embedding(query, k)
+
+    def _retrieve_hybrid(self, query: str, k: int) -> List[Dict]:
+        # Dense and BM25 candidates are fused by reciprocal rank. If the
+        # embedding server is slow or down, answer from BM25 alone rather
+        # than wait; the dense call finishes in the background and still
+        # warms the retrieval cache.
+        n = 2 * k
+        # Run in a copy of the context so the request's stage timings see it
+        future = _get_dense_pool().submit(contextvars.copy_context().run, self._retrieve_dense, query, n)
+        lexical = self._lexical_query(query, n)
+        try:
+            dense = future.result(timeout=settings.hybrid_dense_timeout or None)
+        except Exception:
+            return lexical[:k]
+        return rrf_fuse([dense, lexical], top_k=k, k=settings.rrf_k)
 
     def retrieve(self, query: str, top_k: Optional[int] = None):
         k = top_k or self.top_k
+        self._refresh()
+        if self.mode == "lexical":
+            return self._lexical_query(query, k)
+        if self.mode == "hybrid":
+            return self._retrieve_hybrid(query, k)
+        return self._retrieve_dense(query, k)
+
+    def _retrieve_dense_many(self, queries: List[str], k: int, include: Optional[List[str]]) -> List[List[Dict]]:
         mode = (settings.chroma_query_mode or "auto").lower()
         if mode in ("text", "auto"):
             try:
-                return self.store.query_text(query, top_k=k)
+                return self._cached_hits_many(
+                    [("text", normalize_query(q), k) for q in queries],
+                    lambda idx: self.store.query_text_many([queries[i] for i in idx], top_k=k, include=include),
+                    include,
+                )
+            except Exception:
+                pass
+        q_embs = self._embed_queries(queries)
+        return self._cached_hits_many(
+            [(embedding_key(e), k) for e in q_embs],
+            lambda idx: self.store.query_many([q_embs[i] for i in idx], top_k=k, include=include),
+            include,
+        )
+
+    def retrieve_many(
+        self, queries: List[str], top_k: Optional[int] = None, include: Optional[List[str]] = None
+    ) -> List[List[Dict]]:
+        """Batched `retrieve`: one embedding call and one store query for all queries.
+
+        `include` selects the fields of each hit using Chroma's names
+        (documents, metadatas, distances, embeddings); the default matches
+        `retrieve`. BM25 hits never carry embeddings. Results are in input
+        order. Batch callers are not latency bound, so hybrid mode waits
+        for the dense half here.
+        """
+        if not queries:
+            return []
+        k = top_k or self.top_k
+        self._refresh()
+        if self.mode == "lexical":
+            return [_project(self._lexical_query(q, k), include) for q in queries]
+        if self.mode == "hybrid":
+            dense = self._retrieve_dense_many(queries, 2 * k, include)
+            return [
+                _project(rrf_fuse([d, self._lexical_query(q, 2 * k)], top_k=k, k=settings.rrf_k), include)
+                for q, d in zip(queries, dense)
+            ]
+        return self._retrieve_dense_many(queries, k, include)
+
+    async def _aretrieve_dense(self, query: str, k: int) -> List[Dict]:
+        mode = (settings.chroma_query_mode or "auto").lower()
+        if mode in ("text", "auto"):
+            try:
+                return await asyncio.to_thread(self._search_text, query, k)
             except Exception:
-                # Fall back to embeddings if text mode isn't supported
                 pass
-        if mode in ("embed", "auto"):
-            q_emb = self.emb.embed_query(query)
-            return self.store.query(q_emb, top_k=k)
-        # Default fallback
-        q_emb = self.emb.embed_query(query)
-        return self.store.query(q_emb, top_k=k)
+        q_emb = await self._aembed_query(query)
+        return await asyncio.to_thread(self._search_vector, q_emb, k)
+
+    async def aretrieve(self, query: str, top_k: Optional[int] = None):
+        """Async `retrieve`: awaits the embedding call; local Chroma work runs on a thread."""
+        k = top_k or self.top_k
+        await asyncio.to_thread(self._refresh)
+        if self.mode == "lexical":
+            return self._lexical_query(query, k)
+        if self.mode != "hybrid":
+            return await self._aretrieve_dense(query, k)
+        n = 2 * k
+        dense_task = asyncio.ensure_future(self._aretrieve_dense(query, n))
+        # Consume a late failure of an abandoned dense task
+        dense_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        lexical = self._lexical_query(query, n)
+        try:
+            dense = await asyncio.wait_for(asyncio.shield(dense_task), timeout=settings.hybrid_dense_timeout or None)
+        except Exception:
+            return lexical[:k]
+        return rrf_fuse([dense, lexical], top_k=k, k=settings.rrf_k)
 
     def _parse_chunk(self, doc: str) -> Dict[str, str]:
-        q = a = r = ""
-        for line in (doc or "").splitlines():
-            s = line.strip()
-            if not s:
+        return parse_qa_record(doc)
+
+    @staticmethod
+    def _lookup_result(entry: QAEntry, hits: Optional[List[Dict]], k: int) -> Dict:
+        # The curated record is always source [1]; retrieved hits follow it
+        source = {"id": entry.id, "document": entry.document(), "metadata": {"source": "lookup"}, "distance": 0.0}
+        contexts = [source]
+        # CSV entries and stored chunks use different id schemes ("0" vs
+        # "dmom-0"), so repeats are recognised by their question text too
+        seen_ids = {entry.id}
+        seen_questions = {normalize_question(entry.question)}
+        for h in hits or []:
+            if len(contexts) >= max(1, k):
+                break
+            question = normalize_question(parse_qa_record(h.get("document") or "")["question"])
+            if h.get("id") in seen_ids or (question and question in seen_questions):
                 continue
-            low = s.lower()
-            if low.startswith("question:"):
-                q = s.split(":", 1)[1].strip()
-            elif low.startswith("answer:"):
-                a = s.split(":", 1)[1].strip()
-            elif low.startswith("reference:"):
-                r = s.split(":", 1)[1].strip()
-        return {"question": q, "answer": a, "reference": r}
+            seen_ids.add(h.get("id"))
+            if question:
+                seen_questions.add(question)
+            contexts.append(h)
+        return {"answer": f"{entry.answer} [1]", "contexts": contexts, "lookup": True}
+
+    def lookup_answer(self, question: str, top_k: Optional[int] = None) -> Optional[Dict]:
+        """Answer a verbatim dataset question from the lookup index, or None.
+
+        No embedding or generation happens on a hit unless
+        QUESTION_LOOKUP_CONTEXTS asks for retrieved contexts as well.
+        """
+        if self.lookup is None:
+            return None
+        self._refresh()
+        entry = self.lookup.get(question)
+        if entry is None:
+            return None
+        k = top_k or self.top_k
+        hits = self.retrieve(question, top_k=k) if settings.question_lookup_contexts else None
+        ANSWERS.inc(source="lookup", backend=self.backend)
+        return self._lookup_result(entry, hits, k)
+
+    async def alookup_answer(self, question: str, top_k: Optional[int] = None) -> Optional[Dict]:
+        if self.lookup is None:
+            return None
+        await asyncio.to_thread(self._refresh)
+        entry = self.lookup.get(question)
+        if entry is None:
+            return None
+        k = top_k or self.top_k
+        hits = await self.aretrieve(question, top_k=k) if settings.question_lookup_contexts else None
+        ANSWERS.inc(source="lookup", backend=self.backend)
+        return self._lookup_result(entry, hits, k)
+
+    def _cached_answer(self, question: str, retrieved: List[Dict]) -> Tuple[Optional[str], Optional[List[float]]]:
+        """(cached answer or None, query embedding) from the semantic answer cache."""
+        if self.answer_cache is None:
+            return None, None
+        try:
+            q_emb = self._embed_query(question) if self.mode == "dense" else self._peek_query_embedding(question)
+        except Exception:
+            # No embedding, no cache; generation still works
+            return None, None
+        if q_emb is None:
+            return None, None
+        return self.answer_cache.get(q_emb, [r["id"] for r in retrieved], self.backend_id), q_emb
+
+    async def _acached_answer(self, question: str, retrieved: List[Dict]) -> Tuple[Optional[str], Optional[List[float]]]:
+        if self.answer_cache is None:
+            return None, None
+        try:
+            q_emb = await self._aembed_query(question) if self.mode == "dense" else self._peek_query_embedding(question)
+        except Exception:
+            return None, None
+        if q_emb is None:
+            return None, None
+        return self.answer_cache.get(q_emb, [r["id"] for r in retrieved], self.backend_id), q_emb
+
+    def _peek_query_embedding(self, question: str) -> Optional[List[float]]:
+        # Lexical/hybrid retrieval must not wait on the embedder, so only use
+        # an embedding that dense retrieval already cached
+        if self.cache is None:
+            return None
+        return self.cache.embeddings.get(normalize_query(question))
+
+    def _remember_answer(self, q_emb: Optional[List[float]], retrieved: List[Dict], answer: str):
+        # Only LLM answers are cached; the extractive fallback is cheap anyway
+        if self.answer_cache is not None and q_emb is not None:
+            self.answer_cache.put(q_emb, [r["id"] for r in retrieved], self.backend_id, answer)
+
+    def _diversify(self, question: Optional[str], hits: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """MMR-reorder hits over their stored embeddings; returns (hits, near-duplicates).
+
+        Relevance is cosine to the query embedding when one is already
+        cached, else the retrieval rank. Hits are returned unchanged if
+        any embedding is unavailable.
+        """
+        try:
+            vecs = [h.get("embedding") for h in hits]
+            missing = [h["id"] for h, v in zip(hits, vecs) if v is None]
+            if missing:
+                found = dict(zip(missing, self.store.get_embeddings(missing)))
+                vecs = [v if v is not None else found.get(h["id"]) for h, v in zip(hits, vecs)]
+            if any(v is None for v in vecs):
+                return hits, []
+            q_emb = self._peek_query_embedding(question) if question else None
+            if q_emb is not None:
+                rel = cosine_relevance(q_emb, vecs)
+            else:
+                rel = [1.0 - i / (2.0 * len(hits)) for i in range(len(hits))]
+            order, dups = mmr_order(rel, vecs, lam=settings.context_mmr_lambda, duplicate_threshold=settings.context_duplicate_threshold)
+        except Exception:
+            return hits, []
+        return [hits[i] for i in order], [hits[i] for i in dups]
+
+    def select_contexts(self, retrieved: List[Dict], question: Optional[str] = None) -> AssembledContext:
+        """The retrieved hits that go into the prompt.
+
+        With CONTEXT_DIVERSITY on, hits are first MMR-reordered and
+        near-duplicates removed; then `assemble_context` applies the token
+        budget, adaptive k and field projection.
+        """
+        with stage("context_assembly"):
+            duplicates: List[Dict] = []
+            if settings.context_diversity and len(retrieved) > 1:
+                retrieved, duplicates = self._diversify(question, retrieved)
+            ctx = assemble_context(
+                retrieved,
+                token_budget=settings.context_token_budget,
+                max_distance_ratio=settings.context_max_distance_ratio,
+                reference_chars=settings.context_reference_chars,
+                fields=settings.context_fields,
+            )
+            ctx.dropped = [{"id": h.get("id"), "reason": "duplicate"} for h in duplicates] + ctx.dropped
+            return ctx
 
     def generate(self, question: str, retrieved: List[Dict]) -> str:
-        contexts = [r["document"] for r in retrieved]
-        messages = build_prompt(question, contexts)
+        return self._generate(question, self.select_contexts(retrieved, question))
+
+    def _generate(self, question: str, ctx: AssembledContext) -> str:
+        cached, q_emb = self._cached_answer(question, ctx.hits)
+        if cached:
+            ANSWERS.inc(source="answer_cache", backend=self.backend)
+            return cached
+        with stage("prompt_build"):
+            messages = build_prompt(question, ctx.texts)
         try:
-            answer = self.chat.generate(messages, system=SYSTEM_PROMPT)
+            with stage("generation", self.backend):
+                answer = self.chat.generate(messages, system=SYSTEM_PROMPT)
             if answer:
+                self._remember_answer(q_emb, ctx.hits, answer)
+                ANSWERS.inc(source="llm", backend=self.backend)
                 return answer
         except Exception:
             # fall back below
             pass
 
+        return self._fallback_answer([r["document"] for r in ctx.hits])
+
+    def _fallback_answer(self, contexts: List[str]) -> str:
+        FALLBACKS.inc(backend=self.backend)
+        ANSWERS.inc(source="fallback", backend=self.backend)
+        with stage("fallback", self.backend):
+            return self._extract_answer(contexts)
+
+    def _extract_answer(self, contexts: List[str]) -> str:
         # Fallback: use the top retrieved chunk's answer and append [1]
         if contexts:
             top = self._parse_chunk(contexts[0])
@@ -103,6 +506,147 @@ class RAGPipeline:
         return "(không có kết quả)"
 
     def answer(self, question: str, top_k: Optional[int] = None) -> Dict:
+        found = self.lookup_answer(question, top_k=top_k)
+        if found is not None:
+            return found
         hits = self.retrieve(question, top_k=top_k)
-        answer = self.generate(question, hits)
-        return {"answer": answer, "contexts": hits}
+        ctx = self.select_contexts(hits, question)
+        answer = self._generate(question, ctx)
+        return {"answer": answer, "contexts": ctx.hits, "dropped": ctx.dropped}
+
+    async def agenerate(self, question: str, retrieved: List[Dict]) -> str:
+        return await self._agenerate(question, self.select_contexts(retrieved, question))
+
+    async def _agenerate(self, question: str, ctx: AssembledContext) -> str:
+        cached, q_emb = await self._acached_answer(question, ctx.hits)
+        if cached:
+            ANSWERS.inc(source="answer_cache", backend=self.backend)
+            return cached
+        with stage("prompt_build"):
+            messages = build_prompt(question, ctx.texts)
+        try:
+            agen = getattr(self.chat, "agenerate", None)
+            with stage("generation", self.backend):
+                if agen is not None:
+                    answer = await agen(messages, system=SYSTEM_PROMPT)
+                else:
+                    answer = await asyncio.to_thread(self.chat.generate, messages, system=SYSTEM_PROMPT)
+            if answer:
+                self._remember_answer(q_emb, ctx.hits, answer)
+                ANSWERS.inc(source="llm", backend=self.backend)
+                return answer
+        except Exception:
+            pass
+        return self._fallback_answer([r["document"] for r in ctx.hits])
+
+    async def aanswer(self, question: str, top_k: Optional[int] = None) -> Dict:
+        found = await self.alookup_answer(question, top_k=top_k)
+        if found is not None:
+            return found
+        hits = await self.aretrieve(question, top_k=top_k)
+        ctx = self.select_contexts(hits, question)
+        answer = await self._agenerate(question, ctx)
+        return {"answer": answer, "contexts": ctx.hits, "dropped": ctx.dropped}
+
+    def answer_stream(self, question: str, top_k: Optional[int] = None) -> Iterator[Dict]:
+        """Stream an answer as events, so the first token reaches the user early.
+
+        Yields `{"type": "contexts", "contexts": hits, "dropped": [...]}` once
+        retrieval and context selection are done,
+        then `{"type": "token", "content": str}` pieces as the LLM produces
+        them, and finally `{"type": "done", "answer": str}`. If generation
+        fails mid-stream an `{"type": "error", "error": str}` event precedes
+        `done`; if it fails before any text, the extractive fallback answer
+        is sent as a single token.
+        """
+        found = self.lookup_answer(question, top_k=top_k)
+        if found is not None:
+            yield {"type": "contexts", "contexts": found["contexts"]}
+            yield {"type": "token", "content": found["answer"]}
+            yield {"type": "done", "answer": found["answer"]}
+            return
+
+        ctx = self.select_contexts(self.retrieve(question, top_k=top_k), question)
+        yield {"type": "contexts", "contexts": ctx.hits, "dropped": ctx.dropped}
+
+        cached, q_emb = self._cached_answer(question, ctx.hits)
+        if cached:
+            ANSWERS.inc(source="answer_cache", backend=self.backend)
+            yield {"type": "token", "content": cached}
+            yield {"type": "done", "answer": cached}
+            return
+
+        with stage("prompt_build"):
+            messages = build_prompt(question, ctx.texts)
+        parts: List[str] = []
+        failed = False
+        stream = getattr(self.chat, "generate_stream", None)
+        try:
+            with stage("generation", self.backend):
+                if stream is None:
+                    parts.append(self.chat.generate(messages, system=SYSTEM_PROMPT))
+                    yield {"type": "token", "content": parts[-1]}
+                else:
+                    for piece in stream(messages, system=SYSTEM_PROMPT):
+                        parts.append(piece)
+                        yield {"type": "token", "content": piece}
+        except Exception as e:
+            failed = True
+            if "".join(parts).strip():
+                yield {"type": "error", "error": str(e)}
+
+        answer = "".join(parts).strip()
+        if not answer:
+            answer = self._fallback_answer([r["document"] for r in ctx.hits])
+            yield {"type": "token", "content": answer}
+        elif not failed:
+            self._remember_answer(q_emb, ctx.hits, answer)
+            ANSWERS.inc(source="llm", backend=self.backend)
+        yield {"type": "done", "answer": answer}
+
+    async def aanswer_stream(self, question: str, top_k: Optional[int] = None) -> AsyncIterator[Dict]:
+        """Async `answer_stream`; emits the same events."""
+        found = await self.alookup_answer(question, top_k=top_k)
+        if found is not None:
+            yield {"type": "contexts", "contexts": found["contexts"]}
+            yield {"type": "token", "content": found["answer"]}
+            yield {"type": "done", "answer": found["answer"]}
+            return
+
+        ctx = self.select_contexts(await self.aretrieve(question, top_k=top_k), question)
+        yield {"type": "contexts", "contexts": ctx.hits, "dropped": ctx.dropped}
+
+        cached, q_emb = await self._acached_answer(question, ctx.hits)
+        if cached:
+            ANSWERS.inc(source="answer_cache", backend=self.backend)
+            yield {"type": "token", "content": cached}
+            yield {"type": "done", "answer": cached}
+            return
+
+        with stage("prompt_build"):
+            messages = build_prompt(question, ctx.texts)
+        parts: List[str] = []
+        failed = False
+        stream = getattr(self.chat, "agenerate_stream", None)
+        try:
+            with stage("generation", self.backend):
+                if stream is None:
+                    parts.append(await asyncio.to_thread(self.chat.generate, messages, system=SYSTEM_PROMPT))
+                    yield {"type": "token", "content": parts[-1]}
+                else:
+                    async for piece in stream(messages, system=SYSTEM_PROMPT):
+                        parts.append(piece)
+                        yield {"type": "token", "content": piece}
+        except Exception as e:
+            failed = True
+            if "".join(parts).strip():
+                yield {"type": "error", "error": str(e)}
+
+        answer = "".join(parts).strip()
+        if not answer:
+            answer = self._fallback_answer([r["document"] for r in ctx.hits])
+            yield {"type": "token", "content": answer}
+        elif not failed:
+            self._remember_answer(q_emb, ctx.hits, answer)
+            ANSWERS.inc(source="llm", backend=self.backend)
+        yield {"type": "done", "answer": answer}
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+from .rag import RAGPipeline
+
+
+def key_digest(api_key: Optional[str]) -> str:
+    """Short sha256 of an API key so raw secrets never sit in dict keys."""
+    if not api_key:
+        return ""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class PipelineRegistry:
+    """Thread-safe pool of RAG pipelines keyed by (backend, hashed key, top_k).
+
+    Every pipeline handed out shares the base pipeline's embeddings client,
+    Chroma store, caches and lookup indexes; only the chat client differs.
+    So switching backend per request costs a dict lookup instead of a new
+    PersistentClient and SDK client. Least recently used entries are
+    evicted past `max_size`, and entries idle for `idle_ttl` seconds are
+    dropped on the next access.
+    """
+
+    def __init__(self, base: RAGPipeline, max_size: Optional[int] = None, idle_ttl: Optional[float] = None):
+        self.base = base
+        self.max_size = max(1, int(max_size if max_size is not None else settings.pipeline_cache_size))
+        ttl = idle_ttl if idle_ttl is not None else settings.pipeline_idle_ttl
+        self.idle_ttl = ttl if ttl and ttl > 0 else None
+        self._entries: "OrderedDict[Tuple[str, str, int], Tuple[float, RAGPipeline]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, llm: str, api_key: Optional[str] = None, top_k: Optional[int] = None) -> RAGPipeline:
+        backend = (llm or settings.chat_backend or "ollama").strip().lower()
+        k = int(top_k or self.base.top_k)
+        key = (backend, key_digest(api_key), k)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (now, entry[1])
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Built outside the lock: an SDK client can take a while to set up
+        # and must not stall requests for pipelines already pooled
+        pipeline = RAGPipeline(
+            top_k=k,
+            llm=backend,
+            api_key=api_key,
+            store=self.base.store,
+            emb=self.base.emb,
+            retrieval_cache=self.base.cache,
+            answer_cache=self.base.answer_cache,
+            lexical=self.base.lexical,
+            lookup=self.base.lookup,
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another request built the same pipeline meanwhile; keep theirs
+                self._entries[key] = (time.monotonic(), entry[1])
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._entries[key] = (time.monotonic(), pipeline)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return pipeline
+
+    def _expire(self, now: float):
+        if self.idle_ttl is None:
+            return
+        # Entries are in recency order, so stale ones sit at the front
+        while self._entries:
+            key, (last_used, _) = next(iter(self._entries.items()))
+            if now - last_used <= self.idle_ttl:
+                break
+            del self._entries[key]
+            self.evictions += 1
+
+    def prune(self):
+        """Drop idle entries now (normally done lazily on `get`)."""
+        with self._lock:
+            self._expire(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            backends = [k[0] for k in self._entries]
+        return {
+            "size": len(backends),
+            "max_size": self.max_size,
+            "idle_ttl": self.idle_ttl,
+            "backends": backends,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
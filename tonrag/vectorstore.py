@@ -1,34 +1,137 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import os
-import chromadb
+import threading
+import time
 
 from .config import settings
 
 
+# Fields returned per hit unless a caller asks for a different projection
+DEFAULT_INCLUDE = ["documents", "metadatas", "distances"]
+
+
+def resolve_persist_dir(persist_dir: str | None = None) -> str:
+    """Absolute Chroma directory; relative paths are anchored to the project root."""
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+    cfg_dir = persist_dir or settings.chroma_dir
+    if not os.path.isabs(cfg_dir):
+        cfg_dir = os.path.abspath(os.path.join(base_dir, cfg_dir))
+    return cfg_dir
+
+
+class ChromaClients:
+    """Process-wide registry of Chroma clients, collection handles and stats.
+
+    One PersistentClient per persist dir, so every store in a process
+    shares a single SQLite connection pool and HNSW segment cache.
+    Collection handles are cached per (dir, name); per-collection counts
+    for debug/monitoring are cached and refreshed once older than
+    `stats_ttl` seconds.
+    """
+
+    def __init__(self, stats_ttl: float = 30.0):
+        self.stats_ttl = stats_ttl
+        self._clients: Dict[str, Any] = {}
+        self._collections: Dict[Tuple[str, str], Any] = {}
+        self._stats: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._lock = threading.RLock()
+
+    def client(self, persist_dir: str | None = None):
+        path = resolve_persist_dir(persist_dir)
+        with self._lock:
+            client = self._clients.get(path)
+            if client is None:
+                os.makedirs(path, exist_ok=True)
+                # Imported on first use: chromadb is slow to import and the
+                # numpy backend or lexical-only commands may never need it
+                import chromadb
+
+                # Use PersistentClient to be compatible with on-disk DBs created elsewhere
+                client = chromadb.PersistentClient(path=path)
+                self._clients[path] = client
+            return client
+
+    def collection(self, name: str, persist_dir: str | None = None, create_if_missing: bool = False):
+        path = resolve_persist_dir(persist_dir)
+        key = (path, name)
+        with self._lock:
+            coll = self._collections.get(key)
+            if coll is None:
+                client = self.client(path)
+                coll = client.get_or_create_collection(name=name) if create_if_missing else client.get_collection(name)
+                self._collections[key] = coll
+            return coll
+
+    def refresh(self, name: str, persist_dir: str | None = None):
+        """Re-resolve a cached handle (e.g. after the collection was recreated)."""
+        path = resolve_persist_dir(persist_dir)
+        with self._lock:
+            self._collections.pop((path, name), None)
+            self._stats.pop(path, None)
+        return self.collection(name, path)
+
+    def forget(self, name: str, persist_dir: str | None = None):
+        path = resolve_persist_dir(persist_dir)
+        with self._lock:
+            self._collections.pop((path, name), None)
+            self._stats.pop(path, None)
+
+    def drop_client(self, persist_dir: str | None = None):
+        """Forget the client of a dir and every handle under it (e.g. before deleting the dir)."""
+        path = resolve_persist_dir(persist_dir)
+        with self._lock:
+            self._clients.pop(path, None)
+            self._stats.pop(path, None)
+            for key in [k for k in self._collections if k[0] == path]:
+                del self._collections[key]
+
+    def stats(self, persist_dir: str | None = None, max_age: float | None = None) -> List[Dict[str, Any]]:
+        """[{name, count}] for every collection in the dir, cached for `max_age` seconds."""
+        path = resolve_persist_dir(persist_dir)
+        max_age = self.stats_ttl if max_age is None else max_age
+        with self._lock:
+            cached = self._stats.get(path)
+            if cached is not None and time.monotonic() - cached[0] < max_age:
+                return cached[1]
+            client = self.client(path)
+            cols = []
+            for c in client.list_collections():
+                try:
+                    count = client.get_collection(c.name).count()
+                except Exception:
+                    count = 0
+                cols.append({"name": c.name, "count": count})
+            self._stats[path] = (time.monotonic(), cols)
+            return cols
+
+
+chroma_clients = ChromaClients(stats_ttl=settings.chroma_stats_ttl)
+
+
 class ChromaStore:
     def __init__(self, collection_name: str | None = None, persist_dir: str | None = None, create_if_missing: bool = False):
-        # Resolve persist dir; if relative, anchor to project root (dir of this file/..)
-        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-        cfg_dir = persist_dir or settings.chroma_dir
-        if not os.path.isabs(cfg_dir):
-            cfg_dir = os.path.abspath(os.path.join(base_dir, cfg_dir))
-        self.persist_dir = cfg_dir
-        os.makedirs(self.persist_dir, exist_ok=True)
-        # Use PersistentClient to be compatible with on-disk DBs created elsewhere
-        self.client = chromadb.PersistentClient(path=self.persist_dir)
+        self.persist_dir = resolve_persist_dir(persist_dir)
+        self.client = chroma_clients.client(self.persist_dir)
         name = collection_name or settings.collection_name
+        self.name = name
+        # Bumped on every write through this store so caches keyed on the
+        # collection fingerprint notice local changes immediately.
+        self._writes = 0
+        self._fingerprint: Optional[Tuple] = None
+        self._fingerprint_at = 0.0
+        self._fingerprint_lock = threading.Lock()
 
         # Do NOT attach an internal embedding_function. We always provide
         # embeddings explicitly (e.g., via OllamaEmbeddings) to ensure the
         # collection dimensionality matches the configured embedding model.
         if create_if_missing:
-            self.collection = self.client.get_or_create_collection(name=name)
+            self.collection = chroma_clients.collection(name, self.persist_dir, create_if_missing=True)
         else:
             # Raise error if not found to avoid silently querying an empty collection
             try:
-                self.collection = self.client.get_collection(name)
+                self.collection = chroma_clients.collection(name, self.persist_dir)
             except Exception as e:
                 raise RuntimeError(
                     f"Chroma collection '{name}' not found in '{self.persist_dir}'. Verify CHROMA_DIR/CHROMA_COLLECTION or build the DB."
@@ -36,20 +139,114 @@ class ChromaStore:
 
     def add(self, ids: List[str], documents: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]] | None = None):
         self.collection.add(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+        self._writes += 1
+
+    def upsert(self, ids: List[str], documents: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]] | None = None):
+        self.collection.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+        self._writes += 1
 
-    def _pack(self, res: Dict[str, Any]):
-        docs = (res.get("documents") or [[]])[0]
-        metas = (res.get("metadatas") or [[]])[0]
-        ids = (res.get("ids") or [[]])[0]
-        dists = (res.get("distances") or [[]])[0]
+    def delete(self, ids: List[str], batch_size: int = 1000):
+        for i in range(0, len(ids), batch_size):
+            self.collection.delete(ids=ids[i:i + batch_size])
+        if ids:
+            self._writes += 1
+
+    def iter_metadatas(self, batch_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (id, metadata) for every record, paging through the collection."""
+        offset = 0
+        while True:
+            res = self.collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+            ids = res.get("ids") or []
+            metas = res.get("metadatas") or []
+            for i, id_ in enumerate(ids):
+                yield id_, (metas[i] if i < len(metas) and metas[i] else {})
+            if len(ids) < batch_size:
+                return
+            offset += batch_size
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Yield (id, document, metadata) for every record, paging through the collection."""
+        offset = 0
+        while True:
+            res = self.collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+            ids = res.get("ids") or []
+            docs = res.get("documents") or []
+            metas = res.get("metadatas") or []
+            for i, id_ in enumerate(ids):
+                doc = docs[i] if i < len(docs) else None
+                meta = metas[i] if i < len(metas) else None
+                yield id_, doc or "", meta or {}
+            if len(ids) < batch_size:
+                return
+            offset += batch_size
+
+    def get_embeddings(self, ids: List[str]) -> List[Optional[List[float]]]:
+        """Stored embeddings of `ids` in one lookup, None for unknown ids."""
+        if not ids:
+            return []
+        res = self.collection.get(ids=list(ids), include=["embeddings"])
+        embs = res.get("embeddings")
+        if embs is None:
+            embs = []
+        by_id = {id_: [float(x) for x in emb] for id_, emb in zip(res.get("ids") or [], embs)}
+        return [by_id.get(id_) for id_ in ids]
+
+    def mark_updated(self):
+        """Stamp the collection metadata so other processes see the change.
+
+        Upserts that keep the record count constant do not change anything
+        else in the fingerprint, so a server in another process would keep
+        serving cached hits without this marker.
+        """
+        meta = {k: v for k, v in (self.collection.metadata or {}).items() if not k.startswith("hnsw:")}
+        meta["tonrag_updated_at"] = time.time()
+        self.collection.modify(metadata=meta)
+        self._writes += 1
+
+    def fingerprint(self, max_age: float = 0.0) -> Tuple:
+        """Identify the collection's current contents: (id, count, version, update marker, local writes).
+
+        The count/version lookup is reused for `max_age` seconds so callers
+        on the hot path can check freshness without a round trip each time.
+        """
+        with self._fingerprint_lock:
+            now = time.monotonic()
+            if self._fingerprint is None or now - self._fingerprint_at >= max_age:
+                try:
+                    coll = self.client.get_collection(self.name)
+                    if coll.id != self.collection.id:
+                        # Dropped and recreated elsewhere; swap the stale shared handle
+                        self.collection = chroma_clients.refresh(self.name, self.persist_dir)
+                    model = getattr(coll, "_model", None)
+                    updated_at = (coll.metadata or {}).get("tonrag_updated_at")
+                    self._fingerprint = (str(coll.id), coll.count(), getattr(model, "version", None), updated_at)
+                except Exception:
+                    self._fingerprint = (self.name, None, None, None)
+                self._fingerprint_at = now
+            return self._fingerprint + (self._writes,)
+
+    def _pack(self, res: Dict[str, Any], row: int = 0, include: Optional[List[str]] = None):
+        """Hits of query `row` as dicts holding the `include`d fields."""
+        include = DEFAULT_INCLUDE if include is None else include
+
+        def column(name: str):
+            rows = res.get(name) if name in include else None
+            return rows[row] if rows is not None and row < len(rows) and rows[row] is not None else []
+
+        ids = (res.get("ids") or [[]])[row]
+        docs, metas, dists, embs = column("documents"), column("metadatas"), column("distances"), column("embeddings")
         out = []
-        for i in range(len(docs)):
-            out.append({
-                "id": ids[i],
-                "document": docs[i],
-                "metadata": metas[i] if metas and i < len(metas) else {},
-                "distance": dists[i] if dists and i < len(dists) else None,
-            })
+        for i in range(len(ids)):
+            hit: Dict[str, Any] = {"id": ids[i]}
+            if "documents" in include:
+                hit["document"] = docs[i] if i < len(docs) else None
+            if "metadatas" in include:
+                hit["metadata"] = (metas[i] if i < len(metas) else None) or {}
+            if "distances" in include:
+                hit["distance"] = dists[i] if i < len(dists) else None
+            if "embeddings" in include:
+                hit["embedding"] = [float(x) for x in embs[i]] if i < len(embs) else None
+            out.append(hit)
         return out
 
     def query(self, query_embedding: List[float], top_k: int = 5):
@@ -59,3 +256,41 @@ class ChromaStore:
     def query_text(self, query_text: str, top_k: int = 5):
         res = self.collection.query(query_texts=[query_text], n_results=top_k)
         return self._pack(res)
+
+    def query_many(
+        self, query_embeddings: List[List[float]], top_k: int = 5, include: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Top-k hits for every embedding in one collection query.
+
+        `include` picks the fields returned per hit (Chroma names:
+        documents, metadatas, distances, embeddings); ids are always set.
+        """
+        if not query_embeddings:
+            return []
+        include = list(DEFAULT_INCLUDE if include is None else include)
+        res = self.collection.query(query_embeddings=list(query_embeddings), n_results=top_k, include=include)
+        return [self._pack(res, row, include) for row in range(len(query_embeddings))]
+
+    def query_text_many(
+        self, query_texts: List[str], top_k: int = 5, include: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        if not query_texts:
+            return []
+        include = list(DEFAULT_INCLUDE if include is None else include)
+        res = self.collection.query(query_texts=list(query_texts), n_results=top_k, include=include)
+        return [self._pack(res, row, include) for row in range(len(query_texts))]
+
+
+def get_default_store(create_if_missing: bool = False):
+    """Return the query store selected by VECTOR_BACKEND.
+
+    'chroma' (default) queries the collection directly; 'numpy' loads it
+    into an in-memory `NumpyStore` for exact brute-force search.
+    """
+    store = ChromaStore(create_if_missing=create_if_missing)
+    choice = (getattr(settings, "vector_backend", None) or "chroma").lower()
+    if choice == "numpy":
+        from .numpy_store import NumpyStore
+
+        return NumpyStore(store, snapshot_path=settings.numpy_snapshot_path or None)
+    return store
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import settings
+from .metrics import stage
+
+log = logging.getLogger(__name__)
+
+# Short, in-domain query: loads the embedding model and touches the index
+WARMUP_QUERY = "Mẹ bầu nên bổ sung sắt khi nào?"
+
+
+class Warmer:
+    """Gets a pipeline ready to serve and keeps it that way.
+
+    Runs in a background thread: opens the collection and builds the
+    fingerprint-synced indexes (`_refresh`: BM25, question lookup), embeds a
+    warmup query (loads the embedding model), runs one vector query (loads
+    the HNSW index) and, for Ollama, preloads the chat model. `ready` turns
+    true once every step has succeeded; failed steps are retried every
+    `retry` seconds. Afterwards the model steps are repeated every
+    `refresh_interval` seconds (0 = never) so Ollama does not unload the
+    models between sparse requests.
+    """
+
+    def __init__(
+        self,
+        rag,
+        chat: bool = True,
+        retry: float = 10.0,
+        refresh_interval: float = 240.0,
+        query: str = WARMUP_QUERY,
+    ):
+        self.rag = rag
+        self.retry = max(0.1, retry)
+        self.refresh_interval = max(0.0, refresh_interval)
+        self.query = query
+        self._vector: Optional[List[float]] = None
+        self.steps: List[Tuple[str, Callable[[], Any], bool]] = [
+            ("indexes", rag._refresh, False),
+            ("embedding", self._embed, True),
+            ("vector_index", self._query, True),
+        ]
+        if chat and hasattr(rag.chat, "preload"):
+            self.steps.append(("chat", rag.chat.preload, True))
+        self.status: Dict[str, Dict[str, Any]] = {name: {"ok": False} for name, _, _ in self.steps}
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _embed(self):
+        self._vector = self.rag.emb.embed_query(self.query)
+
+    def _query(self):
+        if self._vector is None:
+            self._embed()
+        self.rag.store.query(self._vector, top_k=1)
+
+    def _run_step(self, name: str, fn: Callable[[], Any]) -> bool:
+        t0 = time.perf_counter()
+        try:
+            with stage(f"warmup_{name}", backend=self.rag.backend):
+                fn()
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+            log.warning("warmup step %s failed: %s", name, error)
+        with self._lock:
+            entry = {"ok": ok, "seconds": round(time.perf_counter() - t0, 3), "at": time.time()}
+            if error:
+                entry["error"] = error
+            self.status[name] = entry
+        return ok
+
+    def warm(self, refresh: bool = False) -> bool:
+        """Run the steps not yet done (all model steps when `refresh`); True when all succeeded."""
+        ok = True
+        for name, fn, resident in self.steps:
+            if self._stop.is_set():
+                return False
+            if self.status[name]["ok"] and not (refresh and resident):
+                continue
+            ok = self._run_step(name, fn) and ok
+        return ok
+
+    def _loop(self):
+        while not self.warm():
+            if self._stop.wait(self.retry):
+                return
+        self._ready.set()
+        while self.refresh_interval > 0 and not self._stop.wait(self.refresh_interval):
+            self.warm(refresh=True)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def start(self) -> "Warmer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="tonrag-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = {name: dict(s) for name, s in self.status.items()}
+        return {"ready": self.ready, "steps": steps}
+
+
+class NoWarmup:
+    """Stand-in when warmup is disabled: ready immediately."""
+
+    ready = True
+
+    def start(self) -> "NoWarmup":
+        return self
+
+    def stop(self):
+        pass
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+    def report(self) -> Dict[str, Any]:
+        return {"ready": True, "steps": {}}
+
+
+def make_warmer(rag):
+    """The warmer configured by WARMUP* settings (not started)."""
+    if not settings.warmup:
+        return NoWarmup()
+    return Warmer(
+        rag,
+        chat=settings.warmup_chat,
+        retry=settings.warmup_retry,
+        refresh_interval=settings.warmup_refresh_interval,
+    )